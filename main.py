@@ -1,62 +1,79 @@
 from src.ingestion.yf_ingestor import YFIngestor
-from src.processing.cleaner import FinancialCleaner
-from src.features.metrics import FinancialMetrics
-from src.analyst.analyst_engine import AnalystEngine
+from src.processing.cleaner import FinancialCleaner
+from src.features.metrics import FinancialMetrics
+from src.analyst.analyst_engine import AnalystEngine
 from src.reporting.pdf_reporter import PDFReporter
 from src.reporting.assembler import ReportAssembler
 from src.reporting.ai_summary import generate_llm_summary
 
-import yfinance as yf
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import argparse
+import hashlib
 import json
+import pickle
 import time
-
-def main(ticker: str | None = None):
-    print("\n=== ASSET ANALYST — ANALISI COMPLETA ===\n")
 
+CACHE_DIR = Path("cache")
+
+def main(ticker: str | None = None):
     # 1️⃣ Input ticker
     if ticker is None:
         ticker = input("Inserisci il ticker (es. AAPL): ").upper()
-    else:
-        ticker = ticker.upper()
-
-    # 2️⃣ Ingestion
-    print("\n➡️  Scarico i bilanci...")
-    ingestor = YFIngestor()
-    ingestor.ingest_all(ticker)
-    report_data = ingestor.get_report_metadata(ticker)
-    
-    # 3️⃣ Cleaning
-    print("➡️  Pulizia bilanci...")
+    return run(ticker)
+
+
+def run(ticker: str) -> Path:
+    """
+    Esegue la pipeline completa per un ticker e ritorna il path del PDF.
+    Richiamabile in-process (server) oltre che da CLI.
+    """
+    print("\n=== ASSET ANALYST — ANALISI COMPLETA ===\n")
+
+    ticker = ticker.upper()
+
+    # 2️⃣ Ingestion
+    print("\n➡️  Scarico i bilanci...")
+    ingestor = YFIngestor()
+    ingestor.ingest_all(ticker)
+    report_data = ingestor.get_report_metadata(ticker)
+    
+    # 3️⃣ Cleaning
+    print("➡️  Pulizia bilanci...")
     cleaner = FinancialCleaner()
     cleaner.clean_all(ticker)
 
-    price_df = None
-    price_path = f"data/processed/{ticker}_price_clean.csv"
-    if Path(price_path).exists():
-        price_df = pd.read_csv(price_path)
-
-    # 4️⃣ Feature Engineering
-    print("➡️  Calcolo metriche finanziarie...")
-    fm = FinancialMetrics()
-    df_features = fm.generate_features(ticker)
-
-    # 5️⃣ Analyst Engine (Analisi modulare)
-    print("➡️  Analisi finanziaria avanzata...")
-    analyst = AnalystEngine()
-    analysis = analyst.analyze(
+    # serve solo la colonna close: niente DataFrame OHLCV completo
+    price_arr = None
+    price_path = Path(f"data/processed/{ticker}_price_clean.parquet")
+    if price_path.exists():
+        price_arr = (
+            pd.read_parquet(price_path, columns=["close"])
+            .to_numpy(dtype=np.float64)
+            .ravel()
+        )
+
+    # 4️⃣ Feature Engineering
+    print("➡️  Calcolo metriche finanziarie...")
+    fm = FinancialMetrics()
+    df_features = fm.generate_features(ticker)
+
+    # 5️⃣ Analyst Engine (Analisi modulare)
+    print("➡️  Analisi finanziaria avanzata...")
+    analyst = AnalystEngine()
+    analysis = _cached_analysis(
+        analyst,
         df_features,
         ticker,
         market_price=report_data.get("current_price"),
-        price_df=price_df
+        price_arr=price_arr
     )
-
-    # 5️⃣ bis — Assembler report
-    assembler = ReportAssembler()
+
+    # 5️⃣ bis — Assembler report
+    assembler = ReportAssembler()
     results = assembler.build(analysis)
-
+
     # prezzo corrente dal metadata (se non già presente)
     results["current_price"] = report_data.get("current_price")
     if (
@@ -75,7 +92,7 @@ def main(ticker: str | None = None):
         results["ai_summary"] = None
 
     # 6️⃣ Report PDF
-    print("➡️  Generazione report PDF professionale...")
+    print("➡️  Generazione report PDF professionale...")
     reporter = PDFReporter()
     reporter.generate_report(
         ticker=ticker,
@@ -86,6 +103,43 @@ def main(ticker: str | None = None):
     _write_report_json(ticker, report_data, results)
     print("\n=== ANALISI COMPLETATA ===")
     print(f"Report PDF salvato in: reports/{ticker}_report.pdf\n")
+    return Path("reports") / f"{ticker}_report.pdf"
+
+
+def _cached_analysis(analyst, df_features, ticker: str, market_price=None, price_arr=None):
+    """
+    Memoizza su disco i risultati di AnalystEngine.analyze.
+    La chiave è l'hash degli input: se bilanci, prezzo e override non
+    sono cambiati, il risultato viene ripescato da cache/ senza rifare
+    quality/valuation/market.
+    """
+    key_src = df_features.to_csv(index=False).encode() + ticker.encode()
+    if price_arr is not None:
+        key_src += price_arr.tobytes()
+    if market_price is not None:
+        key_src += str(market_price).encode()
+    digest = hashlib.sha1(key_src).hexdigest()
+    cache_path = CACHE_DIR / f"{ticker}_{digest}.pkl"
+
+    if cache_path.exists():
+        try:
+            with cache_path.open("rb") as handle:
+                return pickle.load(handle)
+        except Exception:
+            pass  # cache corrotta: ricalcola
+
+    analysis = analyst.analyze(
+        df_features,
+        ticker,
+        market_price=market_price,
+        price_arr=price_arr
+    )
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with cache_path.open("wb") as handle:
+        pickle.dump(analysis, handle)
+
+    return analysis
 
 
 def _json_safe(value):
@@ -115,8 +169,8 @@ def _write_report_json(ticker: str, info: dict, results: dict):
     output_path = reports_dir / f"{ticker}_report.json"
     with output_path.open("w", encoding="utf-8") as handle:
         json.dump(_json_safe(report_payload), handle, ensure_ascii=False, indent=2)
-
-
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--ticker", type=str, help="Ticker da analizzare (es. AAPL)")
@@ -1,8 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
+import asyncio
 import json
 import os
-import subprocess
-import sys
 import time
 import ssl
 from urllib.error import HTTPError, URLError
@@ -10,6 +12,7 @@ from urllib.parse import urlencode
 from urllib.request import Request as UrlRequest, urlopen
 
 import certifi
+from main import run as run_analysis
 from src.reporting.ai_summary import generate_llm_summary
 
 from fastapi import FastAPI, HTTPException, Query, Request
@@ -47,16 +50,29 @@ def index():
     return FileResponse(FRONTEND_DIR / "index.html")
 
 
+# Pool in-process: evita fork + cold import di pandas/yfinance per richiesta.
+_ANALYZE_POOL = ThreadPoolExecutor(max_workers=4)
+
+
+@lru_cache(maxsize=128)
+def _run_analysis_cached(ticker: str, day: date) -> str:
+    # la chiave include la data: i report restano validi per un giorno
+    return str(run_analysis(ticker))
+
+
 @app.post("/analyze")
-def analyze(ticker: str = Query(..., min_length=1, max_length=10)):
+async def analyze(ticker: str = Query(..., min_length=1, max_length=10)):
     clean = ticker.strip().upper()
     if not clean.replace(".", "").replace("-", "").isalnum():
         raise HTTPException(status_code=400, detail="Ticker non valido.")
 
-    cmd = [sys.executable, str(ROOT / "main.py"), "--ticker", clean]
-    result = subprocess.run(cmd, cwd=ROOT, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise HTTPException(status_code=500, detail=result.stderr or "Analisi fallita.")
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            _ANALYZE_POOL, _run_analysis_cached, clean, date.today()
+        )
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc) or "Analisi fallita.") from exc
 
     pdf_path = REPORTS_DIR / f"{clean}_report.pdf"
     if not pdf_path.exists():
@@ -0,0 +1,235 @@
+# src/analyst/_kernels.py
+
+"""
+Kernel numerici compilati con Numba per i percorsi caldi dell'analisi.
+
+Numba è una dipendenza opzionale: se non è installata, ogni kernel
+ricade su un'implementazione NumPy equivalente.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - dipende dall'ambiente
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return decorator
+
+
+@njit(cache=True)
+def max_drawdown_nb(a):
+    """
+    Max drawdown in un solo passaggio: traccia il picco corrente e il
+    drawdown minimo senza allocare array intermedi. I NaN vengono
+    ignorati (i confronti con NaN sono sempre falsi).
+    """
+    base = a[0]
+    peak = -np.inf
+    mdd = 0.0
+    for i in range(len(a)):
+        c = a[i] / base
+        if c > peak:
+            peak = c
+        d = (c - peak) / peak
+        if d < mdd:
+            mdd = d
+    return mdd
+
+
+@njit(cache=True)
+def cagr_nb(start, end, periods):
+    """
+    CAGR tra due estremi: NaN se uno dei due non è positivo.
+    """
+    if start <= 0.0 or end <= 0.0:
+        return np.nan
+    return (end / start) ** (1.0 / periods) - 1.0
+
+
+@njit(cache=True)
+def ann_vol_nb(p):
+    """
+    Volatilità annualizzata dei ritorni giornalieri in un solo passaggio:
+    percent-change, filtro dei non-finiti e std campionaria (ddof=1)
+    fusi in un unico loop Welford, senza array intermedi.
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(1, len(p)):
+        r = (p[i] - p[i - 1]) / p[i - 1]
+        if np.isfinite(r):
+            n += 1
+            delta = r - mean
+            mean += delta / n
+            m2 += delta * (r - mean)
+    if n < 2:
+        return np.nan
+    return np.sqrt(m2 / (n - 1) * 252.0)
+
+
+@njit(cache=True)
+def market_stats_nb(p):
+    """
+    Statistiche di mercato fuse in UNA sola traversata del prezzo:
+    (ret_1y, ret_3y, ret_5y, volatilità annualizzata, max drawdown).
+    Gli orizzonti non coperti dalla serie valgono NaN.
+    """
+    n = len(p)
+    base = p[0]
+    peak = -np.inf
+    mdd = 0.0
+    cnt = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        c = p[i] / base
+        if c > peak:
+            peak = c
+        d = (c - peak) / peak
+        if d < mdd:
+            mdd = d
+        if i > 0:
+            r = (p[i] - p[i - 1]) / p[i - 1]
+            if np.isfinite(r):
+                cnt += 1
+                delta = r - mean
+                mean += delta / cnt
+                m2 += delta * (r - mean)
+
+    vol = np.nan
+    if cnt >= 2:
+        vol = np.sqrt(m2 / (cnt - 1) * 252.0)
+
+    r1 = np.nan
+    r3 = np.nan
+    r5 = np.nan
+    if n >= 252:
+        r1 = p[-1] / p[-252] - 1.0
+        if n > 756:
+            r3 = p[-1] / p[-756] - 1.0
+        if n > 1260:
+            r5 = p[-1] / p[-1260] - 1.0
+
+    return r1, r3, r5, vol, mdd
+
+
+@njit(cache=True)
+def mean_std_nb(a):
+    """
+    Media e deviazione standard campionaria (ddof=1) in un solo
+    passaggio, con l'algoritmo di Welford per la stabilità numerica.
+    """
+    n = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(len(a)):
+        n += 1
+        delta = a[i] - mean
+        mean += delta / n
+        m2 += delta * (a[i] - mean)
+    if n < 2:
+        return mean, np.nan
+    return mean, np.sqrt(m2 / (n - 1))
+
+
+@njit(cache=True)
+def _rate_row(inp, out):
+    """
+    Logica di rating per una riga
+    [fair, price, quality_score, volatility, max_drawdown, v_conf, q_conf]
+    → [value, quality, market, risk, total].
+    Stessa semantica di RatingEngine.analyze (confidence già sanificate).
+    """
+    fair = inp[0]
+    price = inp[1]
+    quality = inp[2]
+    vol = inp[3]
+    dd = inp[4]
+    v_conf = inp[5]
+    q_conf = inp[6]
+
+    v = 50.0
+    if np.isfinite(fair) and np.isfinite(price) and price > 0.0:
+        v = 50.0 + (fair / price - 1.0) * 100.0
+
+    q = quality if np.isfinite(quality) else 50.0
+
+    m = 100.0
+    if np.isfinite(vol):
+        m -= vol * 100.0
+    if np.isfinite(dd):
+        m += dd * 50.0
+
+    r = 100.0
+    if np.isfinite(vol):
+        r -= vol * 80.0
+    if np.isfinite(fair) and np.isfinite(price) and price > fair:
+        r -= 20.0
+
+    v = min(100.0, max(0.0, v))
+    q = min(100.0, max(0.0, q))
+    m = min(100.0, max(0.0, m))
+    r = min(100.0, max(0.0, r))
+
+    m_conf = 1.0 if (np.isfinite(vol) or np.isfinite(dd)) else 0.0
+    r_conf = 1.0 if (np.isfinite(vol) or (np.isfinite(price) and np.isfinite(fair))) else 0.0
+
+    w = v_conf + q_conf + m_conf + r_conf
+    if w > 0.0:
+        total = (v * v_conf + q * q_conf + m * m_conf + r * r_conf) / w
+    else:
+        total = 0.25 * (v + q + m + r)
+
+    out[0] = v
+    out[1] = q
+    out[2] = m
+    out[3] = r
+    out[4] = total
+
+
+if NUMBA_AVAILABLE:
+    from numba import guvectorize
+
+    @guvectorize(
+        ["void(float64[:], float64[:], float64[:])"],
+        "(n),(m)->(m)",
+        nopython=True,
+        cache=True,
+    )
+    def _rate_rows_gu(inp, _dummy, out):
+        _rate_row(inp, out)
+
+    def rate_batch(inputs: np.ndarray) -> np.ndarray:
+        """
+        Applica il kernel di rating a un array (N, 7) → (N, 5).
+        """
+        return _rate_rows_gu(inputs, np.empty(5, dtype=np.float64))
+
+else:
+    def rate_batch(inputs: np.ndarray) -> np.ndarray:
+        out = np.empty(inputs.shape[:-1] + (5,), dtype=np.float64)
+        for row, res in zip(inputs.reshape(-1, inputs.shape[-1]), out.reshape(-1, 5)):
+            _rate_row(row, res)
+        return out
+
+
+def max_drawdown_np(a):
+    """
+    Fallback NumPy vettoriale, equivalente a max_drawdown_nb.
+    """
+    cumulative = a / a[0]
+    peak = np.fmax.accumulate(cumulative)
+    drawdown = (cumulative - peak) / peak
+    return float(np.nanmin(drawdown))
+
+
+if not NUMBA_AVAILABLE:
+    max_drawdown_nb = max_drawdown_np
@@ -12,22 +12,30 @@ class AnalystEngine:
     Non contiene logica di business.
     """
 
-    def analyze(self, df, ticker: str, market_price=None, price_df=None):
+    def __init__(self):
+        # sotto-componenti stateless: istanziati una volta e riusati
+        self.quality = QualityAnalyzer()
+        self.valuation = ValuationEngine()
+        self.market = MarketAnalyzer()
+        self.rating = RatingEngine()
+
+    def analyze(self, df, ticker: str, market_price=None, price_df=None, price_arr=None):
         # 1. Analisi fondamentali
-        quality = QualityAnalyzer().analyze(df)
+        quality = self.quality.analyze(df)
 
         # 2. Valutazione intrinseca
-        valuation = ValuationEngine().analyze(df)
+        valuation = self.valuation.analyze(df)
 
         # 3. Analisi di mercato
-        market = MarketAnalyzer().analyze(
-            df,
-            market_price_override=market_price,
-            price_df=price_df
-        )
+        market = self.market.analyze(
+            df,
+            market_price_override=market_price,
+            price_df=price_df,
+            price_arr=price_arr
+        )
 
         # 4. Rating analitico
-        rating = RatingEngine().analyze(
+        rating = self.rating.analyze(
             quality=quality,
             valuation=valuation,
             market=market
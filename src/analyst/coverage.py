@@ -1,6 +1,7 @@
 # src/analyst/coverage.py
 
 from dataclasses import dataclass
+from typing import Callable
 import numpy as np
 
 
@@ -16,26 +17,27 @@ def compute_with_fallback(
     series,
     preferred_years: int = 5,
     minimum_years: int = 3,
-    reducer=np.mean
+    reducer: Callable[[np.ndarray], float] = np.mean
 ) -> MetricResult:
     if series is None:
         return MetricResult(None, 0, preferred_years, 0.0)
 
-    clean = series.dropna()
+    # il reducer lavora sull'ndarray grezzo: niente dispatch pandas
+    arr = series.to_numpy(dtype=np.float64, copy=False)
+    arr = arr[~np.isnan(arr)]
 
-    if len(clean) < minimum_years:
+    if len(arr) < minimum_years:
         return MetricResult(
             value=None,
-            years_used=len(clean),
+            years_used=len(arr),
             years_required=preferred_years,
             confidence=0.0
         )
 
-    used = min(len(clean), preferred_years)
-    subset = clean.tail(used)
+    used = min(len(arr), preferred_years)
 
     return MetricResult(
-        value=float(reducer(subset)),
+        value=float(reducer(arr[-used:])),
         years_used=used,
         years_required=preferred_years,
         confidence=used / preferred_years
@@ -76,14 +78,13 @@ def aggregate_metric_results(results, min_valid: int = 2):
             "confidence": 0.0
         }
 
-    values = [v for v, _ in extracted]
-    confidences = [c for _, c in extracted]
+    pairs = np.array(extracted, dtype=np.float64)
 
     return {
-        "value": float(np.mean(values)),
+        "value": float(pairs[:, 0].mean()),
         "used": len(extracted),
         "total": len(results),
-        "confidence": float(np.mean(confidences))
+        "confidence": float(pairs[:, 1].mean())
     }
 
 
@@ -3,6 +3,8 @@
 import pandas as pd
 import numpy as np
 
+from src.analyst._kernels import ann_vol_nb, market_stats_nb, max_drawdown_nb
+
 
 class MarketAnalyzer:
     """
@@ -24,71 +26,74 @@ class MarketAnalyzer:
                 return df[name]
         return None
 
+    def _price_array(self, df: pd.DataFrame, price_df: pd.DataFrame = None):
+        """
+        Estrae la serie prezzi come ndarray float64 (una sola volta).
+        """
+        source = price_df if price_df is not None else df
+        price = self.find_field(source, ["close", "adj_close"])
+        if price is None:
+            return None
+        return price.to_numpy(dtype=np.float64, copy=False)
+
     # -------------------------------------------------
     # 1. MARKET PRICE
     # -------------------------------------------------
-    def market_price(self, df: pd.DataFrame, override_price=None, price_df: pd.DataFrame = None):
+    def market_price(self, df: pd.DataFrame, override_price=None, price_df: pd.DataFrame = None, price_arr: np.ndarray = None):
         if override_price is not None and np.isfinite(override_price):
             return float(override_price)
+        if price_arr is not None and len(price_arr) > 0:
+            return float(price_arr[-1])
         source = price_df if price_df is not None else df
         price = self.find_field(source, ["close", "adj_close", "price"])
         if price is None:
             return np.nan
-        return float(price.iloc[-1])
+        return float(price.to_numpy()[-1])
 
     # -------------------------------------------------
     # 2. RETURNS
     # -------------------------------------------------
-    def returns(self, df: pd.DataFrame, price_df: pd.DataFrame = None):
-        source = price_df if price_df is not None else df
-        price = self.find_field(source, ["close", "adj_close"])
-        if price is None or len(price) < 252:
+    def returns(self, df: pd.DataFrame, price_df: pd.DataFrame = None, price_arr: np.ndarray = None):
+        arr = price_arr if price_arr is not None else self._price_array(df, price_df)
+        if arr is None or len(arr) < 252:
             return {}
 
-        returns = price.pct_change()
-
         return {
-            "1Y": float((price.iloc[-1] / price.iloc[-252]) - 1),
-            "3Y": float((price.iloc[-1] / price.iloc[-756]) - 1) if len(price) > 756 else np.nan,
-            "5Y": float((price.iloc[-1] / price.iloc[-1260]) - 1) if len(price) > 1260 else np.nan,
+            "1Y": float((arr[-1] / arr[-252]) - 1),
+            "3Y": float((arr[-1] / arr[-756]) - 1) if len(arr) > 756 else np.nan,
+            "5Y": float((arr[-1] / arr[-1260]) - 1) if len(arr) > 1260 else np.nan,
         }
 
     # -------------------------------------------------
     # 3. VOLATILITY
     # -------------------------------------------------
-    def volatility(self, df: pd.DataFrame, price_df: pd.DataFrame = None):
-        source = price_df if price_df is not None else df
-        price = self.find_field(source, ["close", "adj_close"])
-        if price is None:
+    def volatility(self, df: pd.DataFrame, price_df: pd.DataFrame = None, price_arr: np.ndarray = None):
+        arr = price_arr if price_arr is not None else self._price_array(df, price_df)
+        if arr is None:
             return np.nan
 
-        returns = price.pct_change().dropna()
-        return float(returns.std() * np.sqrt(252))
+        return float(ann_vol_nb(arr))
 
     # -------------------------------------------------
     # 4. MAX DRAWDOWN
     # -------------------------------------------------
-    def max_drawdown(self, df: pd.DataFrame, price_df: pd.DataFrame = None):
-        source = price_df if price_df is not None else df
-        price = self.find_field(source, ["close", "adj_close"])
-        if price is None:
+    def max_drawdown(self, df: pd.DataFrame, price_df: pd.DataFrame = None, price_arr: np.ndarray = None):
+        arr = price_arr if price_arr is not None else self._price_array(df, price_df)
+        if arr is None or len(arr) == 0:
             return np.nan
 
-        cumulative = price / price.iloc[0]
-        peak = cumulative.cummax()
-        drawdown = (cumulative - peak) / peak
-
-        return float(drawdown.min())
+        return float(max_drawdown_nb(arr))
 
     # -------------------------------------------------
     # 5. MARKET MULTIPLES
     # -------------------------------------------------
-    def market_multiples(self, df: pd.DataFrame, market_price_override=None, price_df: pd.DataFrame = None):
-        price = self.market_price(
-            df,
-            override_price=market_price_override,
-            price_df=price_df
-        )
+    def market_multiples(self, df: pd.DataFrame, market_price_override=None, price_df: pd.DataFrame = None, price=None):
+        if price is None:
+            price = self.market_price(
+                df,
+                override_price=market_price_override,
+                price_df=price_df
+            )
 
         net_income = self.find_field(df, ["net_income"])
         fcf = self.find_field(df, ["free_cash_flow"])
@@ -97,15 +102,16 @@ class MarketAnalyzer:
         pe = np.nan
         p_fcf = np.nan
 
+        # estrazioni scalari via ndarray: niente indexer pandas
+        sh = shares.to_numpy()[-1] if shares is not None else np.nan
+
         if net_income is not None and shares is not None:
-            ni = net_income.iloc[-1]
-            sh = shares.iloc[-1]
+            ni = net_income.to_numpy()[-1]
             if ni > 0 and sh > 0:
                 pe = price / (ni / sh)
 
         if fcf is not None and shares is not None:
-            f = fcf.iloc[-1]
-            sh = shares.iloc[-1]
+            f = fcf.to_numpy()[-1]
             if f > 0 and sh > 0:
                 p_fcf = price / (f / sh)
 
@@ -117,19 +123,37 @@ class MarketAnalyzer:
     # -------------------------------------------------
     # 6. SYNTHESIS
     # -------------------------------------------------
-    def analyze(self, df: pd.DataFrame, market_price_override=None, price_df: pd.DataFrame = None):
+    def analyze(self, df: pd.DataFrame, market_price_override=None, price_df: pd.DataFrame = None, price_arr: np.ndarray = None):
+        # un'unica estrazione della serie prezzi e dello spot,
+        # condivise da tutte le metriche
+        if price_arr is None:
+            price_arr = self._price_array(df, price_df)
+        spot = self.market_price(
+            df,
+            override_price=market_price_override,
+            price_df=price_df,
+            price_arr=price_arr
+        )
+
+        # ritorni, volatilità e drawdown in un'unica traversata
+        if price_arr is not None and len(price_arr) > 0:
+            r1, r3, r5, vol, mdd = market_stats_nb(price_arr)
+            returns = (
+                {"1Y": float(r1), "3Y": float(r3), "5Y": float(r5)}
+                if len(price_arr) >= 252
+                else {}
+            )
+            volatility = float(vol)
+            max_drawdown = float(mdd)
+        else:
+            returns = {}
+            volatility = np.nan
+            max_drawdown = np.nan
+
         return {
-            "market_price": self.market_price(
-                df,
-                override_price=market_price_override,
-                price_df=price_df
-            ),
-            "returns": self.returns(df, price_df=price_df),
-            "volatility": self.volatility(df, price_df=price_df),
-            "max_drawdown": self.max_drawdown(df, price_df=price_df),
-            "multiples": self.market_multiples(
-                df,
-                market_price_override=market_price_override,
-                price_df=price_df
-            ),
+            "market_price": spot,
+            "returns": returns,
+            "volatility": volatility,
+            "max_drawdown": max_drawdown,
+            "multiples": self.market_multiples(df, price=spot),
         }
@@ -3,6 +3,8 @@
 import numpy as np
 import pandas as pd
 
+from src.analyst._kernels import cagr_nb, mean_std_nb
+
 
 class QualityAnalyzer:
     """
@@ -30,8 +32,11 @@ class QualityAnalyzer:
 
     @staticmethod
     def _mean_ignore_nan(values):
-        clean = [v for v in values if np.isfinite(v)]
-        return float(np.mean(clean)) if clean else np.nan
+        if not values:
+            return np.nan
+        a = np.asarray(values, dtype=np.float64)
+        mask = np.isfinite(a)
+        return float(a[mask].mean()) if mask.any() else np.nan
 
     @staticmethod
     def _score_range(value, low, high):
@@ -44,15 +49,17 @@ class QualityAnalyzer:
         return float(np.clip(score, 0, 100))
 
     @staticmethod
-    def _safe_cagr_endpoints(series: pd.Series, periods: int):
-        clean = series.dropna()
-        if len(clean) < periods + 1:
-            return np.nan
-        start = clean.iloc[-(periods + 1)]
-        end = clean.iloc[-1]
-        if start <= 0 or end <= 0:
+    def _dropna_array(series: pd.Series):
+        if series is None:
+            return None
+        arr = series.to_numpy(dtype=np.float64, copy=False)
+        return arr[~np.isnan(arr)]
+
+    @staticmethod
+    def _safe_cagr_endpoints(arr: np.ndarray, periods: int):
+        if len(arr) < periods + 1:
             return np.nan
-        return float((end / start) ** (1 / periods) - 1)
+        return float(cagr_nb(arr[-(periods + 1)], arr[-1], periods))
 
     @staticmethod
     def _confidence(years_used, years_required):
@@ -60,35 +67,55 @@ class QualityAnalyzer:
             return 0.0
         return float(min(1.0, years_used / years_required))
 
+    # Colonne usate dalle quattro dimensioni: il dropna viene fatto
+    # una sola volta per analyze(), non per ogni metodo.
+    _CACHE_COLUMNS = (
+        "operating_margin",
+        "net_margin",
+        "total_revenue",
+        "net_income",
+        "free_cash_flow",
+        "debt_to_equity",
+        "debt_to_assets",
+        "current_ratio",
+        "quick_ratio",
+    )
+
+    def _column_cache(self, df: pd.DataFrame):
+        cache = {}
+        for col in self._CACHE_COLUMNS:
+            series = df.get(col)
+            if series is not None:
+                cache[col] = self._dropna_array(series)
+        return cache
+
     # ======================================================
     # PROFITABILITY
     # ======================================================
-    def _profitability(self, df: pd.DataFrame):
+    def _profitability(self, cache: dict):
         metrics = {}
         scores = []
 
         years_required = 5
 
-        op_margin = df.get("operating_margin")
-        net_margin = df.get("net_margin")
+        op_margin = cache.get("operating_margin")
+        net_margin = cache.get("net_margin")
 
         years_used = 0
 
-        if op_margin is not None:
-            clean = op_margin.dropna()
-            if len(clean) >= 3:
-                avg = clean.tail(years_required).mean()
-                metrics["operating_margin_avg"] = avg
-                scores.append(self._score_range(avg, 0.05, 0.30))
-                years_used = max(years_used, len(clean.tail(years_required)))
-
-        if net_margin is not None:
-            clean = net_margin.dropna()
-            if len(clean) >= 3:
-                avg = clean.tail(years_required).mean()
-                metrics["net_margin_avg"] = avg
-                scores.append(self._score_range(avg, 0.03, 0.20))
-                years_used = max(years_used, len(clean.tail(years_required)))
+        if op_margin is not None and len(op_margin) >= 3:
+            tail = op_margin[-years_required:]
+            avg = float(tail.mean())
+            metrics["operating_margin_avg"] = avg
+            scores.append(self._score_range(avg, 0.05, 0.30))
+            years_used = max(years_used, len(tail))
+
+        if net_margin is not None and len(net_margin) >= 3:
+            tail = net_margin[-years_required:]
+            avg = float(tail.mean())
+            metrics["net_margin_avg"] = avg
+            scores.append(self._score_range(avg, 0.03, 0.20))
+            years_used = max(years_used, len(tail))
 
         score = self._mean_ignore_nan(scores)
         confidence = self._confidence(years_used, years_required)
@@ -98,44 +125,40 @@ class QualityAnalyzer:
     # ======================================================
     # GROWTH QUALITY
     # ======================================================
-    def _growth_quality(self, df: pd.DataFrame):
+    def _growth_quality(self, cache: dict):
         metrics = {}
         scores = []
 
         years_required = 5
         years_used = 0
 
-        rev = df.get("total_revenue")
-        ni = df.get("net_income")
-        fcf = df.get("free_cash_flow")
+        rev_arr = cache.get("total_revenue")
+        ni_arr = cache.get("net_income")
+        fcf_arr = cache.get("free_cash_flow")
 
         # Revenue growth
-        if rev is not None:
-            clean = rev.dropna()
-            if len(clean) >= 3:
-                g = self._safe_cagr_endpoints(clean, 2)
-                metrics["revenue_growth"] = g
-                scores.append(self._score_range(g, 0.00, 0.15))
-                years_used = max(years_used, len(clean.tail(years_required)))
+        if rev_arr is not None and len(rev_arr) >= 3:
+            g = self._safe_cagr_endpoints(rev_arr, 2)
+            metrics["revenue_growth"] = g
+            scores.append(self._score_range(g, 0.00, 0.15))
+            years_used = max(years_used, min(len(rev_arr), years_required))
 
         # Earnings or FCF growth (prefer FCF)
         growth_base = None
 
-        if fcf is not None and fcf.dropna().shape[0] >= 3:
-            clean = fcf.dropna()
+        if fcf_arr is not None and len(fcf_arr) >= 3:
             growth_base = "fcf"
-            g = self._safe_cagr_endpoints(clean, 2)
+            g = self._safe_cagr_endpoints(fcf_arr, 2)
             metrics["fcf_growth"] = g
             scores.append(self._score_range(g, 0.00, 0.15))
-            years_used = max(years_used, len(clean.tail(years_required)))
+            years_used = max(years_used, min(len(fcf_arr), years_required))
 
-        elif ni is not None and ni.dropna().shape[0] >= 3:
-            clean = ni.dropna()
+        elif ni_arr is not None and len(ni_arr) >= 3:
             growth_base = "net_income"
-            g = self._safe_cagr_endpoints(clean, 2)
+            g = self._safe_cagr_endpoints(ni_arr, 2)
             metrics["net_income_growth"] = g
             scores.append(self._score_range(g, 0.00, 0.15))
-            years_used = max(years_used, len(clean.tail(years_required)))
+            years_used = max(years_used, min(len(ni_arr), years_required))
 
         # Penalità: crescita ricavi senza conversione in FCF
         if (
@@ -154,51 +177,43 @@ class QualityAnalyzer:
     # ======================================================
     # FINANCIAL STRENGTH
     # ======================================================
-    def _financial_strength(self, df: pd.DataFrame):
+    def _financial_strength(self, cache: dict):
         metrics = {}
         scores = []
 
         years_required = 3
         years_used = 0
 
-        dte = df.get("debt_to_equity")
-        dta = df.get("debt_to_assets")
-        current_ratio = df.get("current_ratio")
-        quick_ratio = df.get("quick_ratio")
+        dte = cache.get("debt_to_equity")
+        dta = cache.get("debt_to_assets")
+        current_ratio = cache.get("current_ratio")
+        quick_ratio = cache.get("quick_ratio")
 
         dte_used = False
-        if dte is not None:
-            clean = dte.dropna()
-            if not clean.empty:
-                v = clean.iloc[-1]
-                metrics["debt_to_equity"] = v
-                scores.append(self._score_range(-v, -2.5, 0.0))
-                years_used = 1
-                dte_used = True
-
-        if not dte_used and dta is not None:
-            clean = dta.dropna()
-            if not clean.empty:
-                v = clean.iloc[-1]
-                metrics["debt_to_assets"] = v
-                scores.append(self._score_range(-v, -1.0, 0.0))
-                years_used = 1
-
-        if current_ratio is not None:
-            clean = current_ratio.dropna()
-            if not clean.empty:
-                v = clean.iloc[-1]
-                metrics["current_ratio"] = v
-                scores.append(self._score_range(v, 1.0, 3.0))
-                years_used = max(years_used, 1)
-
-        if quick_ratio is not None:
-            clean = quick_ratio.dropna()
-            if not clean.empty:
-                v = clean.iloc[-1]
-                metrics["quick_ratio"] = v
-                scores.append(self._score_range(v, 0.7, 2.0))
-                years_used = max(years_used, 1)
+        if dte is not None and len(dte) > 0:
+            v = dte[-1]
+            metrics["debt_to_equity"] = v
+            scores.append(self._score_range(-v, -2.5, 0.0))
+            years_used = 1
+            dte_used = True
+
+        if not dte_used and dta is not None and len(dta) > 0:
+            v = dta[-1]
+            metrics["debt_to_assets"] = v
+            scores.append(self._score_range(-v, -1.0, 0.0))
+            years_used = 1
+
+        if current_ratio is not None and len(current_ratio) > 0:
+            v = current_ratio[-1]
+            metrics["current_ratio"] = v
+            scores.append(self._score_range(v, 1.0, 3.0))
+            years_used = max(years_used, 1)
+
+        if quick_ratio is not None and len(quick_ratio) > 0:
+            v = quick_ratio[-1]
+            metrics["quick_ratio"] = v
+            scores.append(self._score_range(v, 0.7, 2.0))
+            years_used = max(years_used, 1)
 
 
         score = self._mean_ignore_nan(scores)
@@ -209,37 +224,39 @@ class QualityAnalyzer:
     # ======================================================
     # STABILITY & PREDICTABILITY
     # ======================================================
-    def _stability(self, df: pd.DataFrame):
+    def _stability(self, cache: dict):
         metrics = {}
         scores = []
 
         years_required = 5
         years_used = 0
 
-        ni = df.get("net_income")
-        fcf = df.get("free_cash_flow")
-        op_margin = df.get("operating_margin")
+        ni = cache.get("net_income")
+        fcf = cache.get("free_cash_flow")
+        op_margin = cache.get("operating_margin")
 
-        if ni is not None and ni.dropna().shape[0] >= 3:
-            clean = ni.dropna().tail(years_required)
-            vol = clean.std() / (abs(clean.mean()) + 1e-6)
+        if ni is not None and len(ni) >= 3:
+            tail = ni[-years_required:]
+            mean, std = mean_std_nb(tail)
+            vol = std / (abs(mean) + 1e-6)
             metrics["net_income_volatility"] = vol
             scores.append(self._score_range(-vol, -1.0, 0.0))
-            years_used = max(years_used, len(clean))
+            years_used = max(years_used, len(tail))
 
-        if fcf is not None and fcf.dropna().shape[0] >= 3:
-            clean = fcf.dropna().tail(years_required)
-            vol = clean.std() / (abs(clean.mean()) + 1e-6)
+        if fcf is not None and len(fcf) >= 3:
+            tail = fcf[-years_required:]
+            mean, std = mean_std_nb(tail)
+            vol = std / (abs(mean) + 1e-6)
             metrics["fcf_volatility"] = vol
             scores.append(self._score_range(-vol, -1.0, 0.0))
-            years_used = max(years_used, len(clean))
+            years_used = max(years_used, len(tail))
 
-        if op_margin is not None and op_margin.dropna().shape[0] >= 3:
-            clean = op_margin.dropna().tail(years_required)
-            vol = clean.std()
+        if op_margin is not None and len(op_margin) >= 3:
+            tail = op_margin[-years_required:]
+            vol = mean_std_nb(tail)[1]
             metrics["operating_margin_volatility"] = vol
             scores.append(self._score_range(-vol, -0.15, 0.0))
-            years_used = max(years_used, len(clean))
+            years_used = max(years_used, len(tail))
 
         score = self._mean_ignore_nan(scores)
         confidence = self._confidence(years_used, years_required)
@@ -250,23 +267,26 @@ class QualityAnalyzer:
     # PUBLIC API
     # ======================================================
     def analyze(self, df: pd.DataFrame):
-        p_score, p_conf, p_metrics = self._profitability(df)
-        g_score, g_conf, g_metrics = self._growth_quality(df)
-        f_score, f_conf, f_metrics = self._financial_strength(df)
-        s_score, s_conf, s_metrics = self._stability(df)
+        cache = self._column_cache(df)
+
+        p_score, p_conf, p_metrics = self._profitability(cache)
+        g_score, g_conf, g_metrics = self._growth_quality(cache)
+        f_score, f_conf, f_metrics = self._financial_strength(cache)
+        s_score, s_conf, s_metrics = self._stability(cache)
 
-        scores = [p_score, g_score, f_score, s_score]
-        confidences = [p_conf, g_conf, f_conf, s_conf]
+        scores = np.array([p_score, g_score, f_score, s_score], dtype=np.float64)
+        confidences = np.array([p_conf, g_conf, f_conf, s_conf], dtype=np.float64)
 
-        valid_scores = [s for s in scores if np.isfinite(s)]
+        valid = np.isfinite(scores)
+        n_valid = int(valid.sum())
 
         quality_score = (
-            float(np.mean(valid_scores)) if len(valid_scores) >= 2 else np.nan
+            float(scores[valid].mean()) if n_valid >= 2 else np.nan
         )
 
         quality_confidence = (
-            float(np.mean([c for c in confidences if c > 0]))
-            if len(valid_scores) >= 2
+            float(confidences[confidences > 0].mean())
+            if n_valid >= 2
             else 0.0
         )
 
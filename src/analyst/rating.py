@@ -1,7 +1,39 @@
 # src/analyst/rating.py
 
+from functools import lru_cache
+
 import numpy as np
 
+from src.analyst._kernels import rate_batch
+
+
+@lru_cache(maxsize=None)
+def _make_total_fn(mask: int):
+    """
+    Genera (una sola volta per pattern di confidence attive) una funzione
+    specializzata che calcola il totale pesato senza rami: i termini con
+    confidence nulla vengono eliminati alla generazione del codice.
+
+    mask: bit 3..0 = v_conf>0, q_conf>0, m_conf>0, r_conf>0.
+    """
+    names = ("v", "q", "m", "r")
+    active = [n for i, n in enumerate(names) if mask & (1 << (3 - i))]
+
+    if not active:
+        body = "    return 0.25 * (v_score + q_score + m_score + r_score)"
+    else:
+        num = " + ".join(f"{n}_score * {n}_conf" for n in active)
+        den = " + ".join(f"{n}_conf" for n in active)
+        body = f"    return ({num}) / ({den})"
+
+    src = (
+        "def _total(v_score, q_score, m_score, r_score, "
+        "v_conf, q_conf, m_conf, r_conf):\n" + body
+    )
+    namespace = {}
+    exec(src, namespace)
+    return namespace["_total"]
+
 
 class RatingEngine:
     """
@@ -19,7 +51,8 @@ class RatingEngine:
 
     @staticmethod
     def _is_valid(x):
-        return x is not None and np.isfinite(x)
+        # equivalente scalare di np.isfinite, senza dispatch NumPy
+        return x is not None and x == x and -np.inf < x < np.inf
 
     # -------------------------------------------------
     # VALUE SCORE
@@ -33,8 +66,7 @@ class RatingEngine:
 
         upside = (fair / price) - 1
 
-        score = 50 + upside * 100
-        return self.clamp(score)
+        return 50 + upside * 100
 
     # -------------------------------------------------
     # QUALITY SCORE
@@ -48,7 +80,7 @@ class RatingEngine:
         if not self._is_valid(score):
             return 50
 
-        return self.clamp(score)
+        return score
 
     # -------------------------------------------------
     # MARKET SCORE
@@ -65,7 +97,7 @@ class RatingEngine:
         if self._is_valid(drawdown):
             score += drawdown * 50  # drawdown è negativo
 
-        return self.clamp(score)
+        return score
 
     # -------------------------------------------------
     # RISK SCORE
@@ -83,7 +115,7 @@ class RatingEngine:
         if self._is_valid(fair) and self._is_valid(price) and price > fair:
             score -= 20  # sopravvalutazione
 
-        return self.clamp(score)
+        return score
 
     # -------------------------------------------------
     # FINAL RATING
@@ -96,14 +128,37 @@ class RatingEngine:
         else:
             return "SELL"
 
+    # -------------------------------------------------
+    # BATCH ANALYZE
+    # -------------------------------------------------
+    def analyze_batch(self, inputs) -> np.ndarray:
+        """
+        Rating vettoriale per watchlist / batch multi-ticker.
+
+        inputs: array (N, 7) con colonne
+        [fair_value, market_price, quality_score, volatility,
+         max_drawdown, valuation_confidence, quality_confidence]
+        (confidence già numeriche, NaN per i dati mancanti).
+
+        Ritorna un array (N, 5) con colonne
+        [value_score, quality_score, market_score, risk_score, total_score].
+        """
+        arr = np.atleast_2d(np.asarray(inputs, dtype=np.float64))
+        return rate_batch(arr)
+
     # -------------------------------------------------
     # ANALYZE
     # -------------------------------------------------
     def analyze(self, quality: dict, valuation: dict, market: dict):
-        v_score = self.value_score(valuation, market)
-        q_score = self.quality_score(quality)
-        m_score = self.market_score(market)
-        r_score = self.risk_score(market, valuation)
+        # i quattro score grezzi vengono clampati in blocco più sotto
+        scores = np.array([
+            self.value_score(valuation, market),
+            self.quality_score(quality),
+            self.market_score(market),
+            self.risk_score(market, valuation),
+        ], dtype=np.float64)
+        np.clip(scores, 0.0, 100.0, out=scores)
+        v_score, q_score, m_score, r_score = scores
 
         v_conf = float(valuation.get("valuation_confidence", 0.0) or 0.0)
         q_conf = float(quality.get("quality_confidence", 0.0) or 0.0)
@@ -119,12 +174,17 @@ class RatingEngine:
         fair = valuation.get("fair_value")
         r_conf = 1.0 if (self._is_valid(vol) or (self._is_valid(price) and self._is_valid(fair))) else 0.0
 
-        scores = [v_score, q_score, m_score, r_score]
-        weights = [v_conf, q_conf, m_conf, r_conf]
-        if sum(weights) > 0:
-            total = float(np.average(scores, weights=weights))
-        else:
-            total = float(np.mean(scores))
+        w = v_conf + q_conf + m_conf + r_conf
+        mask = (
+            ((v_conf > 0) << 3)
+            | ((q_conf > 0) << 2)
+            | ((m_conf > 0) << 1)
+            | (r_conf > 0)
+        )
+        total = _make_total_fn(mask)(
+            v_score, q_score, m_score, r_score,
+            v_conf, q_conf, m_conf, r_conf,
+        )
         rating = self.final_rating(total)
 
         return {
@@ -133,6 +193,6 @@ class RatingEngine:
             "market_score": round(m_score, 1),
             "risk_score": round(r_score, 1),
             "total_score": round(total, 1),
-            "score_confidence": round(float(np.mean([v_conf, q_conf, m_conf, r_conf])), 2),
+            "score_confidence": round(0.25 * w, 2),
             "rating": rating,
         }
@@ -16,6 +16,9 @@ class ValuationEngine:
 
     NEUTRAL_SCORE = 50.0
 
+    # orizzonte esplicito del DCF (anni 1..5), allocato una volta
+    _DCF_YEARS = np.arange(1, 6, dtype=np.float64)
+
     # -------------------------------------------------
     # UTILS
     # -------------------------------------------------
@@ -23,6 +26,17 @@ class ValuationEngine:
     def _is_valid(x):
         return x is not None and np.isfinite(x)
 
+    @staticmethod
+    def _last(df: pd.DataFrame, col: str):
+        """
+        Ultimo valore grezzo di una colonna (può essere NaN), senza
+        indexer pandas: accesso diretto al backing array.
+        """
+        series = df.get(col)
+        if series is None or len(series) == 0:
+            return np.nan
+        return series.array[-1]
+
     @staticmethod
     def _latest_value(series: pd.Series):
         if series is None:
@@ -32,16 +46,14 @@ class ValuationEngine:
             return np.nan
         return float(clean.iloc[-1])
 
-    def _equity_value_from_enterprise(self, enterprise_value, df: pd.DataFrame):
+    def _equity_value_from_enterprise(self, enterprise_value, net_debt):
         if not self._is_valid(enterprise_value):
             return np.nan
-        net_debt = self._latest_value(df.get("net_debt"))
         if self._is_valid(net_debt):
             return float(enterprise_value - net_debt)
         return float(enterprise_value)
 
-    def _to_per_share(self, total_value, df: pd.DataFrame):
-        shares = self._latest_value(df.get("ordinary_shares_number"))
+    def _to_per_share(self, total_value, shares):
         if not self._is_valid(total_value) or not self._is_valid(shares) or shares <= 0:
             return np.nan
         return float(total_value / shares)
@@ -52,13 +64,15 @@ class ValuationEngine:
         - se nessuno valido → NaN + confidence 0
         - altrimenti media + confidence proporzionale
         """
-        valid = [v for v in values if self._is_valid(v)]
+        a = np.asarray(values, dtype=np.float64)
+        mask = np.isfinite(a)
+        n_valid = int(mask.sum())
 
-        if not valid:
+        if n_valid == 0:
             return np.nan, 0.0
 
-        confidence = len(valid) / len(values)
-        return float(np.mean(valid)), confidence
+        confidence = n_valid / len(a)
+        return float(a[mask].mean()), confidence
 
     # -------------------------------------------------
     # 1. NORMALIZED FCF
@@ -78,16 +92,16 @@ class ValuationEngine:
     # 2. GROWTH RATE
     # -------------------------------------------------
     def growth_rate(self, df: pd.DataFrame):
-        rev_g = df.get("revenue_cagr_3y")
-        fcf_g = df.get("fcf_cagr_3y")
+        rev_g = self._last(df, "revenue_cagr_3y")
+        fcf_g = self._last(df, "fcf_cagr_3y")
 
         g_vals = []
 
-        if rev_g is not None and self._is_valid(rev_g.iloc[-1]):
-            g_vals.append(rev_g.iloc[-1])
+        if self._is_valid(rev_g):
+            g_vals.append(rev_g)
 
-        if fcf_g is not None and self._is_valid(fcf_g.iloc[-1]):
-            g_vals.append(fcf_g.iloc[-1])
+        if self._is_valid(fcf_g):
+            g_vals.append(fcf_g)
 
         if not g_vals:
             return np.nan
@@ -99,41 +113,74 @@ class ValuationEngine:
     # 3. DISCOUNT RATE
     # -------------------------------------------------
     def discount_rate(self, df: pd.DataFrame):
-        dta = df.get("debt_to_assets")
-        if dta is None or not self._is_valid(dta.iloc[-1]):
+        dta = self._last(df, "debt_to_assets")
+        if not self._is_valid(dta):
             return 0.10  # fallback conservativo
 
-        r = 0.08 + 0.04 * dta.iloc[-1]
+        r = 0.08 + 0.04 * dta
         return float(np.clip(r, 0.07, 0.12))
 
     # -------------------------------------------------
     # 4. DCF MODEL
     # -------------------------------------------------
-    def dcf_value(self, df: pd.DataFrame, g=None, r=None, terminal_g=0.02):
-        fcf0 = self.normalized_fcf(df)
+    def dcf_value(self, df: pd.DataFrame, g=None, r=None, terminal_g=0.02, fcf0=None):
+        fcf0 = self.normalized_fcf(df) if fcf0 is None else fcf0
         g = self.growth_rate(df) if g is None else g
         r = self.discount_rate(df) if r is None else r
 
         if not self._is_valid(fcf0) or not self._is_valid(g) or r <= g:
             return np.nan
 
-        value = 0.0
-        fcf = fcf0
+        # flussi e fattori di sconto per i 5 anni in un'unica espressione
+        t = self._DCF_YEARS
+        growth = (1 + g) ** t
+        disc = (1 + r) ** t
+
+        value = fcf0 * np.sum(growth / disc)
+        terminal = fcf0 * growth[-1] * (1 + terminal_g) / ((r - terminal_g) * disc[-1])
+
+        return float(value + terminal)
+
+    def _dcf_batch(self, fcf0, g, r, terminal_g):
+        """
+        DCF vettoriale: stessa matematica di dcf_value, calcolata in
+        broadcasting su array di scenari (shape (S, 5) sull'asse tempo).
+        """
+        g = np.asarray(g, dtype=np.float64)
+        r = np.asarray(r, dtype=np.float64)
+        tg = np.asarray(terminal_g, dtype=np.float64)
 
-        for t in range(1, 6):
-            fcf *= (1 + g)
-            value += fcf / ((1 + r) ** t)
+        t = self._DCF_YEARS
+        growth = (1 + g[:, None]) ** t
+        disc = (1 + r[:, None]) ** t
 
-        terminal = (fcf * (1 + terminal_g)) / (r - terminal_g)
-        value += terminal / ((1 + r) ** 5)
+        value = fcf0 * (growth / disc).sum(axis=1)
+        terminal = fcf0 * growth[:, -1] * (1 + tg) / ((r - tg) * disc[:, -1])
 
-        return float(value)
+        out = value + terminal
+        out[~np.isfinite(g) | (r <= g)] = np.nan
+        if not self._is_valid(fcf0):
+            out[:] = np.nan
+        return out
+
+    def _buffett_batch(self, fcf0, g, r):
+        """
+        Owner earnings perpetui in broadcasting sugli scenari.
+        """
+        g = np.asarray(g, dtype=np.float64)
+        r = np.asarray(r, dtype=np.float64)
+
+        out = fcf0 * (1 + g) / (r - g)
+        out[~np.isfinite(g) | (r <= g)] = np.nan
+        if not self._is_valid(fcf0):
+            out[:] = np.nan
+        return out
 
     # -------------------------------------------------
     # 5. BUFFETT / OWNER EARNINGS
     # -------------------------------------------------
-    def buffett_value(self, df: pd.DataFrame, g=None, r=None):
-        fcf0 = self.normalized_fcf(df)
+    def buffett_value(self, df: pd.DataFrame, g=None, r=None, fcf0=None):
+        fcf0 = self.normalized_fcf(df) if fcf0 is None else fcf0
         g = self.growth_rate(df) if g is None else g
         r = self.discount_rate(df) if r is None else r
 
@@ -164,9 +211,9 @@ class ValuationEngine:
 
         return float(eps * pe_fair)
 
-    def _scenario_params(self, df: pd.DataFrame):
-        g_base = self.growth_rate(df)
-        r_base = self.discount_rate(df)
+    def _scenario_params(self, df: pd.DataFrame, g_base=None, r_base=None):
+        g_base = self.growth_rate(df) if g_base is None else g_base
+        r_base = self.discount_rate(df) if r_base is None else r_base
         return {
             "base": {
                 "g": g_base,
@@ -197,44 +244,96 @@ class ValuationEngine:
         Ritorna valutazioni per-share e confidence.
         """
 
-        params = self._scenario_params(df)
+        # input dei modelli memoizzati una sola volta per analyze():
+        # ogni modello e ogni scenario li riusa senza ricalcolarli
+        fcf0 = self.normalized_fcf(df)
+        g0 = self.growth_rate(df)
+        r0 = self.discount_rate(df)
+
+        params = self._scenario_params(df, g_base=g0, r_base=r0)
+
+        # scalari "ultimo valore valido" estratti una sola volta,
+        # riusati da tutte le conversioni equity/per-share
+        net_debt = self._latest_value(df.get("net_debt"))
+        shares = self._latest_value(df.get("ordinary_shares_number"))
+
+        dcf_total = self.dcf_value(df, g=g0, r=r0, fcf0=fcf0)
+        buffett_total = self.buffett_value(df, g=g0, r=r0, fcf0=fcf0)
+
+        # multipli per tutti gli scenari in un'unica espressione:
+        # eps calcolato una volta, poi moltiplicato per il vettore dei PE
+        # (stessa semantica di multiples_value: ultimo valore grezzo)
+        names = list(params)
+        ni_last = self._last(df, "net_income")
+        sh_last = self._last(df, "ordinary_shares_number")
+        eps_val = np.nan
+        if self._is_valid(ni_last) and sh_last > 0:
+            eps_val = ni_last / sh_last
+
+        pes = np.array([params[n]["pe"] for n in names], dtype=np.float64)
+        if self._is_valid(eps_val) and eps_val > 0:
+            mults = eps_val * pes
+        else:
+            mults = np.full(len(names), np.nan)
 
-        dcf_total = self.dcf_value(df)
-        buffett_total = self.buffett_value(df)
-        multiples_ps = self.multiples_value(df)
+        multiples_ps = float(mults[0]) if np.isfinite(mults[0]) else np.nan
 
-        dcf_equity = self._equity_value_from_enterprise(dcf_total, df)
-        buffett_equity = self._equity_value_from_enterprise(buffett_total, df)
+        dcf_equity = self._equity_value_from_enterprise(dcf_total, net_debt)
+        buffett_equity = self._equity_value_from_enterprise(buffett_total, net_debt)
 
-        dcf_ps = self._to_per_share(dcf_equity, df)
-        buffett_ps = self._to_per_share(buffett_equity, df)
+        dcf_ps = self._to_per_share(dcf_equity, shares)
+        buffett_ps = self._to_per_share(buffett_equity, shares)
 
         # valori per-share (possono essere NaN)
         model_values = [dcf_ps, buffett_ps, multiples_ps]
 
         fair_value, confidence = self._safe_score(model_values)
 
-        scenarios = {}
-        for name, p in params.items():
-            dcf_t = self.dcf_value(df, g=p["g"], r=p["r"], terminal_g=p["terminal_g"])
-            buffett_t = self.buffett_value(df, g=p["g"], r=p["r"])
-            dcf_eq = self._equity_value_from_enterprise(dcf_t, df)
-            buffett_eq = self._equity_value_from_enterprise(buffett_t, df)
-            dcf_ps = self._to_per_share(dcf_eq, df)
-            buffett_ps = self._to_per_share(buffett_eq, df)
-            mult_ps = self.multiples_value(df, pe_fair=p["pe"])
-            scenario_values = [dcf_ps, buffett_ps, mult_ps]
-            scenario_fv, scenario_conf = self._safe_score(scenario_values)
-            scenarios[name] = {
-                "fair_value": scenario_fv,
-                "confidence": scenario_conf,
-                "assumptions": {
-                    "g": p["g"],
-                    "r": p["r"],
-                    "terminal_g": p["terminal_g"],
-                    "pe": p["pe"],
-                },
+        if not (self._is_valid(fcf0) and self._is_valid(g0)):
+            # niente FCF normalizzato o growth validi: DCF e Buffett sono
+            # NaN in ogni scenario, resta in gioco solo il multiplo già
+            # calcolato — il loop degli scenari può essere saltato
+            scenarios = {
+                name: {
+                    "fair_value": float(mults[i]) if np.isfinite(mults[i]) else np.nan,
+                    "confidence": 1.0 / 3.0 if np.isfinite(mults[i]) else 0.0,
+                    "assumptions": {
+                        "g": params[name]["g"],
+                        "r": params[name]["r"],
+                        "terminal_g": params[name]["terminal_g"],
+                        "pe": params[name]["pe"],
+                    },
+                }
+                for i, name in enumerate(names)
             }
+        else:
+            # modelli DCF/Buffett per tutti gli scenari in un solo broadcast
+            gs = np.array([params[n]["g"] for n in names], dtype=np.float64)
+            rs = np.array([params[n]["r"] for n in names], dtype=np.float64)
+            tgs = np.array([params[n]["terminal_g"] for n in names], dtype=np.float64)
+
+            dcf_batch = self._dcf_batch(fcf0, gs, rs, tgs)
+            buffett_batch = self._buffett_batch(fcf0, gs, rs)
+
+            scenarios = {}
+            for i, name in enumerate(names):
+                p = params[name]
+                dcf_eq = self._equity_value_from_enterprise(dcf_batch[i], net_debt)
+                buffett_eq = self._equity_value_from_enterprise(buffett_batch[i], net_debt)
+                dcf_ps = self._to_per_share(dcf_eq, shares)
+                buffett_ps = self._to_per_share(buffett_eq, shares)
+                scenario_values = [dcf_ps, buffett_ps, mults[i]]
+                scenario_fv, scenario_conf = self._safe_score(scenario_values)
+                scenarios[name] = {
+                    "fair_value": scenario_fv,
+                    "confidence": scenario_conf,
+                    "assumptions": {
+                        "g": p["g"],
+                        "r": p["r"],
+                        "terminal_g": p["terminal_g"],
+                        "pe": p["pe"],
+                    },
+                }
 
         return {
             # MODELLI (possono essere NaN)
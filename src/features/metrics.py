@@ -1,265 +1,423 @@
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-
-class FinancialMetrics:
-    """
-    Calcolo delle metriche fondamentali:
-    - Profitability
-    - Margins
-    - Growth
-    - Cash Flow Strength
-    - Leverage & Liquidity
-    - Valuation ratios
-    - Efficiency
-    """
-
-    def __init__(self, processed_path: str = "data/processed", features_path: str = "data/features"):
-        self.processed_path = Path(processed_path)
-        self.features_path = Path(features_path)
-        self.features_path.mkdir(parents=True, exist_ok=True)
-
-    # ---------------------------------------------------------
-    # 1. CARICAMENTO E MERGE DEI TRE BILANCI
-    # ---------------------------------------------------------
-
-    def load_clean(self, ticker: str):
-        """
-        Carica i CSV puliti generati dal cleaner e li mergea in un unico DataFrame.
-        """
-
-        is_df = pd.read_csv(self.processed_path / f"{ticker}_income_clean.csv")
-        bs_df = pd.read_csv(self.processed_path / f"{ticker}_balance_clean.csv")
-        cf_df = pd.read_csv(self.processed_path / f"{ticker}_cashflow_clean.csv")
-
-        df = is_df.merge(bs_df, on="date", suffixes=("_is", "_bs"), how="outer")
-        df = df.merge(cf_df, on="date", suffixes=("", "_cf"), how="outer")
-
-        df["date"] = pd.to_datetime(df["date"])
-        df = df.sort_values("date").reset_index(drop=True)
-
-        return df
-
-    # ---------------------------------------------------------
-    # 2. CALCOLO METRICHE
-    # ---------------------------------------------------------
-
-    def compute_metrics(self, df: pd.DataFrame):
-        """
-        Calcola tutte le metriche fondamentali note.
-        Usa field fallback perché Yahoo Finance cambia spesso nomenclatura.
-        """
-
-        def find_field(possible_names):
-            for name in possible_names:
-                if name in df.columns:
-                    return df[name]
-            return pd.Series([np.nan] * len(df))
-
-        # Normalizzazione campi
-        equity = find_field([
-            "total_stockholder_equity",
-            "stockholders_equity",
-            "total_equity",
-            "total_shareholder_equity",
-            "total_equity_gross",
-            "common_stock_equity",
-            "total_equity_gross_minority_interest",
-        ])
-
-        debt = find_field([
-            "total_debt",
-            "short_long_term_debt",
-            "short_long_term_debt_total",
-            "total_debt_bs",
-            "long_term_debt",
-        ])
-
-        cash = find_field([
-            "cash",
-            "cash_and_cash_equivalents",
-            "cash_cash_equivalents_and_short_term_investments",
-            "cash_and_cash_equivalents_and_short_term_investments",
-        ])
-
-        short_term_investments = find_field([
-            "other_short_term_investments",
-            "short_term_investments",
-            "short_term_investment",
-        ])
-
-        current_assets = find_field(["total_current_assets", "current_assets"])
-        current_liabilities = find_field(["total_current_liabilities", "current_liabilities"])
-        total_assets = find_field(["total_assets"])
-
-        operating_income = find_field(["operating_income", "ebit"])
-        gross_profit = find_field(["gross_profit"])
-        revenue = find_field(["total_revenue"])
-        net_income = find_field(["net_income"])
-
-        fcf = find_field(["free_cash_flow"])
-        depreciation = find_field(["depreciation_and_amortization"])
-        capex = find_field(["capital_expenditure"])
-
-        receivables = find_field([
-            "net_receivables",
-            "accounts_receivable",
-            "receivables",
-            "gross_accounts_receivable",
-        ])
-        inventory = find_field(["inventory"])
-
-        cost_of_revenue = find_field(["cost_of_revenue", "reconciled_cost_of_revenue"])
+import logging
+from pathlib import Path
 
-        # Costruiamo le nuove metriche in blocco per evitare frammentazione DataFrame.
-        metrics = {}
+import numpy as np
+import pandas as pd
 
-        # ------------------ PROFITABILITY ------------------ #
-        eps = 1e-6
+_log = logging.getLogger(__name__)
 
-        metrics["roe"] = np.where(
-            equity > eps,
-            net_income / equity,
-            np.nan
-        )
-        metrics["roic"] = np.where(
-            (equity + debt) > eps,
-            operating_income / (equity + debt),
-            np.nan
-        )
-        metrics["debt_to_equity"] = np.where(
-            equity > eps,
-            debt / equity,
-            np.nan
-        )
-        raw_net_debt = find_field(["net_debt"])
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # decoratore identità: il fallback NumPy resta utilizzabile
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+# Alias Yahoo Finance per ogni campo normalizzato: la nomenclatura cambia
+# spesso, quindi la risoluzione avviene per membership su un set di colonne
+# invece di uno scan lineare ripetuto sul DataFrame.
+_FIELD_ALIASES = {
+    "equity": (
+        "total_stockholder_equity",
+        "stockholders_equity",
+        "total_equity",
+        "total_shareholder_equity",
+        "total_equity_gross",
+        "common_stock_equity",
+        "total_equity_gross_minority_interest",
+    ),
+    "debt": (
+        "total_debt",
+        "short_long_term_debt",
+        "short_long_term_debt_total",
+        "total_debt_bs",
+        "long_term_debt",
+    ),
+    "cash": (
+        "cash",
+        "cash_and_cash_equivalents",
+        "cash_cash_equivalents_and_short_term_investments",
+        "cash_and_cash_equivalents_and_short_term_investments",
+    ),
+    "short_term_investments": (
+        "other_short_term_investments",
+        "short_term_investments",
+        "short_term_investment",
+    ),
+    "current_assets": ("total_current_assets", "current_assets"),
+    "current_liabilities": ("total_current_liabilities", "current_liabilities"),
+    "total_assets": ("total_assets",),
+    "operating_income": ("operating_income", "ebit"),
+    "gross_profit": ("gross_profit",),
+    "revenue": ("total_revenue",),
+    "net_income": ("net_income",),
+    "fcf": ("free_cash_flow",),
+    "depreciation": ("depreciation_and_amortization",),
+    "capex": ("capital_expenditure",),
+    "receivables": (
+        "net_receivables",
+        "accounts_receivable",
+        "receivables",
+        "gross_accounts_receivable",
+    ),
+    "inventory": ("inventory",),
+    "cost_of_revenue": ("cost_of_revenue", "reconciled_cost_of_revenue"),
+    "net_debt": ("net_debt",),
+    "shares": ("ordinary_shares_number",),
+}
+
+# Campi impilati (in quest'ordine) nella matrice passata al kernel.
+_KERNEL_FIELDS = (
+    "equity",
+    "debt",
+    "cash",
+    "short_term_investments",
+    "current_assets",
+    "current_liabilities",
+    "total_assets",
+    "operating_income",
+    "gross_profit",
+    "revenue",
+    "net_income",
+    "fcf",
+    "receivables",
+    "inventory",
+    "cost_of_revenue",
+    "net_debt",
+    "shares",
+)
+
+# Righe della matrice di output, nell'ordine prodotto dal kernel.
+_METRIC_NAMES = (
+    "roe",
+    "roic",
+    "debt_to_equity",
+    "net_debt",
+    "gross_margin",
+    "operating_margin",
+    "net_margin",
+    "fcf_margin",
+    "fcf_to_net_income",
+    "revenue_growth",
+    "net_income_growth",
+    "fcf_growth",
+    "revenue_cagr_3y",
+    "net_income_cagr_3y",
+    "fcf_cagr_3y",
+    "debt_to_assets",
+    "current_ratio",
+    "quick_ratio",
+    "book_value_per_share",
+    "earnings_per_share",
+    "fcf_per_share",
+    "asset_turnover",
+    "inventory_turnover",
+    "receivables_turnover",
+)
+
+
+@njit(cache=True, error_model="numpy")
+def _metrics_kernel(F):
+    """
+    Kernel fuso: tutte le metriche in un'unica passata per riga.
+    F: matrice (len(_KERNEL_FIELDS), n), output (len(_METRIC_NAMES), n).
+    """
+    n = F.shape[1]
+    out = np.full((24, n), np.nan)
+    eps = 1e-6
+    third = 1.0 / 3.0
+
+    for i in range(n):
+        equity = F[0, i]
+        debt = F[1, i]
+        cash = F[2, i]
+        sti = F[3, i]
+        current_assets = F[4, i]
+        current_liabilities = F[5, i]
+        total_assets = F[6, i]
+        operating_income = F[7, i]
+        gross_profit = F[8, i]
+        revenue = F[9, i]
+        net_income = F[10, i]
+        fcf = F[11, i]
+        receivables = F[12, i]
+        inventory = F[13, i]
+        cost_of_revenue = F[14, i]
+        raw_net_debt = F[15, i]
+        shares = F[16, i]
+
+        # profitability
+        if equity > eps:
+            out[0, i] = net_income / equity
+            out[2, i] = debt / equity
+        invested = equity + debt
+        if invested > eps:
+            out[1, i] = operating_income / invested
+
+        # net debt: valore esplicito se presente, altrimenti ricostruito
+        if raw_net_debt == raw_net_debt:
+            out[3, i] = raw_net_debt
+        else:
+            cash_valid = cash == cash
+            sti_valid = sti == sti
+            if (cash_valid or sti_valid) and debt == debt:
+                cash_total = (cash if cash_valid else 0.0) + (sti if sti_valid else 0.0)
+                out[3, i] = debt - cash_total
+
+        # margins (non guardati, come il path vettoriale)
+        out[4, i] = gross_profit / revenue
+        out[5, i] = operating_income / revenue
+        out[6, i] = net_income / revenue
+
+        # cash flow
+        out[7, i] = fcf / revenue
+        if abs(net_income) > eps:
+            out[8, i] = fcf / net_income
+
+        # growth
+        if i >= 1:
+            out[9, i] = revenue / F[9, i - 1] - 1
+            out[10, i] = net_income / F[10, i - 1] - 1
+            out[11, i] = fcf / F[11, i - 1] - 1
+        if i >= 3:
+            prev = F[9, i - 3]
+            if revenue > 0 and prev > 0:
+                out[12, i] = (revenue / prev) ** third - 1
+            prev = F[10, i - 3]
+            if net_income > 0 and prev > 0:
+                out[13, i] = (net_income / prev) ** third - 1
+            prev = F[11, i - 3]
+            if fcf > 0 and prev > 0:
+                out[14, i] = (fcf / prev) ** third - 1
+
+        # leverage / liquidity
+        if total_assets > eps:
+            out[15, i] = debt / total_assets
+            out[21, i] = revenue / total_assets
+        if current_liabilities > eps:
+            out[16, i] = current_assets / current_liabilities
+            out[17, i] = (cash + receivables) / current_liabilities
+
+        # valuation per share
+        if shares > eps:
+            if equity > eps:
+                out[18, i] = equity / shares
+            out[19, i] = net_income / shares
+            out[20, i] = fcf / shares
+
+        # efficiency
+        if inventory > eps:
+            out[22, i] = cost_of_revenue / inventory
+        if receivables > eps:
+            out[23, i] = revenue / receivables
+
+    return out
+
+
+def _masked_div(num, denom, mask):
+    # divide solo dove la guardia è vera, NaN altrove:
+    # nessun array intermedio completo come con np.where
+    out = np.full_like(denom, np.nan)
+    np.divide(num, denom, out=out, where=mask)
+    return out
+
+
+def _pct_change(arr):
+    out = np.full_like(arr, np.nan)
+    out[1:] = arr[1:] / arr[:-1] - 1
+    return out
+
+
+def _safe_cagr(arr, years=3):
+    # shift manuale senza allocazioni pandas, poi divisione e
+    # radice calcolate in-place solo dove entrambi i valori > 0
+    prev = np.full_like(arr, np.nan)
+    if len(arr) > years:
+        prev[years:] = arr[:-years]
+    mask = (arr > 0) & (prev > 0)
+    out = np.full_like(arr, np.nan)
+    np.divide(arr, prev, out=out, where=mask)
+    np.power(out, 1.0 / years, out=out, where=mask)
+    np.subtract(out, 1.0, out=out, where=mask)
+    return out
+
+
+def _metrics_fallback(F):
+    """
+    Path NumPy vettoriale, stessa matematica del kernel: usato quando
+    numba non è disponibile.
+    """
+    (equity, debt, cash, short_term_investments, current_assets,
+     current_liabilities, total_assets, operating_income, gross_profit,
+     revenue, net_income, fcf, receivables, inventory, cost_of_revenue,
+     raw_net_debt, shares) = F
+
+    eps = 1e-6
+
+    # le divisioni senza guardia (margini, growth) possono incontrare
+    # 0/NaN al denominatore: i warning sono attesi
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cash_valid = ~np.isnan(cash)
+        sti_valid = ~np.isnan(short_term_investments)
         cash_total = np.where(
-            cash.notna() | short_term_investments.notna(),
-            cash.fillna(0) + short_term_investments.fillna(0),
+            cash_valid | sti_valid,
+            np.where(cash_valid, cash, 0.0)
+            + np.where(sti_valid, short_term_investments, 0.0),
             np.nan
         )
         computed_net_debt = np.where(
-            debt.notna() & ~np.isnan(cash_total),
+            ~np.isnan(debt) & ~np.isnan(cash_total),
             debt - cash_total,
             np.nan
         )
-        metrics["net_debt"] = np.where(
-            raw_net_debt.notna(),
-            raw_net_debt,
-            computed_net_debt
-        )
 
-        # ------------------ MARGINS ------------------ #
-        metrics["gross_margin"] = gross_profit / revenue
-        metrics["operating_margin"] = operating_income / revenue
-        metrics["net_margin"] = net_income / revenue
+        invested = equity + debt
+        liq_mask = current_liabilities > eps
+        shares_mask = shares > eps
 
-        # ------------------ CASH FLOW ------------------ #
-        metrics["fcf_margin"] = fcf / revenue
-        metrics["fcf_to_net_income"] = np.where(
-            np.abs(net_income) > eps,
-            fcf / net_income,
-            np.nan
+        rows = (
+            _masked_div(net_income, equity, equity > eps),
+            _masked_div(operating_income, invested, invested > eps),
+            _masked_div(debt, equity, equity > eps),
+            np.where(~np.isnan(raw_net_debt), raw_net_debt, computed_net_debt),
+            gross_profit / revenue,
+            operating_income / revenue,
+            net_income / revenue,
+            fcf / revenue,
+            _masked_div(fcf, net_income, np.abs(net_income) > eps),
+            _pct_change(revenue),
+            _pct_change(net_income),
+            _pct_change(fcf),
+            _safe_cagr(revenue),
+            _safe_cagr(net_income),
+            _safe_cagr(fcf),
+            _masked_div(debt, total_assets, total_assets > eps),
+            _masked_div(current_assets, current_liabilities, liq_mask),
+            _masked_div(cash + receivables, current_liabilities, liq_mask),
+            _masked_div(equity, shares, (equity > eps) & shares_mask),
+            _masked_div(net_income, shares, shares_mask),
+            _masked_div(fcf, shares, shares_mask),
+            _masked_div(revenue, total_assets, total_assets > eps),
+            _masked_div(cost_of_revenue, inventory, inventory > eps),
+            _masked_div(revenue, receivables, receivables > eps),
         )
 
-        # ------------------ GROWTH ------------------ #
-        metrics["revenue_growth"] = revenue.pct_change()
-        metrics["net_income_growth"] = net_income.pct_change()
-        metrics["fcf_growth"] = fcf.pct_change()
-
-
-        def safe_cagr(series, years=3):
-            prev = series.shift(years)
-            return np.where(
-                (series > 0) & (prev > 0),
-                (series / prev) ** (1 / years) - 1,
-                np.nan
-            )
-
-        metrics["revenue_cagr_3y"] = safe_cagr(revenue)
-        metrics["net_income_cagr_3y"] = safe_cagr(net_income)
-        metrics["fcf_cagr_3y"] = safe_cagr(fcf)
-
-        # ------------------ LEVERAGE ------------------ #
-        metrics["debt_to_assets"] = np.where(
-            total_assets > eps,
-            debt / total_assets,
-            np.nan
-        )
+    return np.vstack(rows)
 
-        # ------------------ LIQUIDITY ------------------ #
-        metrics["current_ratio"] = np.where(
-            current_liabilities > eps,
-            current_assets / current_liabilities,
-            np.nan
-        )
-        metrics["quick_ratio"] = np.where(
-            current_liabilities > eps,
-            (cash + receivables) / current_liabilities,
-            np.nan
-        )
 
-        # ------------------ VALUATION ------------------ #
-        shares = find_field(["ordinary_shares_number"])
+class FinancialMetrics:
+    """
+    Calcolo delle metriche fondamentali:
+    - Profitability
+    - Margins
+    - Growth
+    - Cash Flow Strength
+    - Leverage & Liquidity
+    - Valuation ratios
+    - Efficiency
+    """
 
-        metrics["book_value_per_share"] = np.where(
-            (equity > eps) & (shares > eps),
-            equity / shares,
-            np.nan
-        )
-        metrics["earnings_per_share"] = np.where(
-            shares > eps,
-            net_income / shares,
-            np.nan
-        )
-        metrics["fcf_per_share"] = np.where(
-            shares > eps,
-            fcf / shares,
-            np.nan
-        )
+    def __init__(self, processed_path: str = "data/processed", features_path: str = "data/features"):
+        self.processed_path = Path(processed_path)
+        self.features_path = Path(features_path)
+        self.features_path.mkdir(parents=True, exist_ok=True)
 
+    # ---------------------------------------------------------
+    # 1. CARICAMENTO E MERGE DEI TRE BILANCI
+    # ---------------------------------------------------------
 
-        # ------------------ EFFICIENCY ------------------ #
-        metrics["asset_turnover"] = np.where(
-            total_assets > eps,
-            revenue / total_assets,
-            np.nan
-        )
-        metrics["inventory_turnover"] = np.where(
-            inventory > eps,
-            cost_of_revenue / inventory,
-            np.nan
-        )
+    def load_clean(self, ticker: str):
+        """
+        Carica i bilanci puliti (Parquet) generati dal cleaner e li
+        allinea in un unico DataFrame.
+        """
+
+        is_df = pd.read_parquet(self.processed_path / f"{ticker}_income_clean.parquet").set_index("date")
+        bs_df = pd.read_parquet(self.processed_path / f"{ticker}_balance_clean.parquet").set_index("date")
+        cf_df = pd.read_parquet(self.processed_path / f"{ticker}_cashflow_clean.parquet").set_index("date")
+
+        # stesse regole di suffissi dei vecchi merge a coppie:
+        # income/balance suffissati su entrambi i lati, cashflow solo a destra
+        overlap = is_df.columns.intersection(bs_df.columns)
+        is_df = is_df.rename(columns={c: f"{c}_is" for c in overlap})
+        bs_df = bs_df.rename(columns={c: f"{c}_bs" for c in overlap})
+        taken = is_df.columns.union(bs_df.columns)
+        cf_df = cf_df.rename(columns={c: f"{c}_cf" for c in cf_df.columns if c in taken})
+
+        # un solo allineamento outer sull'indice data al posto di due merge
+        df = pd.concat([is_df, bs_df, cf_df], axis=1, join="outer")
+        df = df.reset_index()
+
+        # Parquet preserva già il dtype datetime: solo riallineamento
+        # alla risoluzione "us" usata dal resto della pipeline
+        df["date"] = pd.to_datetime(df["date"]).astype("datetime64[us]")
+        df = df.sort_values("date").reset_index(drop=True)
+
+        return df
+
+    # ---------------------------------------------------------
+    # 2. CALCOLO METRICHE
+    # ---------------------------------------------------------
+
+    def compute_metrics(self, df: pd.DataFrame):
+        """
+        Calcola tutte le metriche fondamentali note.
+        Usa field fallback perché Yahoo Finance cambia spesso nomenclatura.
+        Il calcolo avviene in un kernel fuso (una passata per riga) con
+        fallback NumPy vettoriale se numba non è installato.
+        """
+
+        cols = set(df.columns)
+        # sentinella condivisa per i campi mancanti (mai mutata)
+        nan_col = np.full(len(df), np.nan)
+
+        def find_field(key):
+            return next(
+                (
+                    df[name].to_numpy(dtype=np.float64, copy=False)
+                    for name in _FIELD_ALIASES[key]
+                    if name in cols
+                ),
+                nan_col,
+            )
+
+        F = np.vstack([find_field(key) for key in _KERNEL_FIELDS])
+        out = _metrics_kernel(F) if NUMBA_AVAILABLE else _metrics_fallback(F)
+
+        # Costruiamo le nuove metriche in blocco per evitare frammentazione DataFrame.
+        metrics = dict(zip(_METRIC_NAMES, out))
 
-        metrics["receivables_turnover"] = np.where(
-            receivables > eps,
-            revenue / receivables,
-            np.nan
-        )
         metrics_df = pd.DataFrame(metrics, index=df.index)
         base_df = df.drop(columns=list(metrics_df.columns), errors="ignore")
-        out_df = pd.concat([base_df, metrics_df], axis=1)
-        return out_df.copy()
-
-    # ---------------------------------------------------------
-    # 3. SALVATAGGIO
-    # ---------------------------------------------------------
-
-    def save_features(self, df: pd.DataFrame, ticker: str):
-        path = self.features_path / f"{ticker}_features.csv"
-        df.to_csv(path, index=False)
-
-    # ---------------------------------------------------------
-    # 4. ENTRY POINT PRINCIPALE
-    # ---------------------------------------------------------
-
-    def generate_features(self, ticker: str):
-        print(f"\n📊 Calcolo metriche finanziarie per: {ticker}")
-
-        df = self.load_clean(ticker)
-        df = self.compute_metrics(df)
-        self.save_features(df, ticker)
-
-        print("✔️ Feature engineering completato.\n")
-        return df
+        return base_df.join(metrics_df)
+
+    # ---------------------------------------------------------
+    # 3. SALVATAGGIO
+    # ---------------------------------------------------------
+
+    def save_features(self, df: pd.DataFrame, ticker: str):
+        path = self.features_path / f"{ticker}_features.parquet"
+        df.to_parquet(path, compression="snappy", index=False)
+
+    # ---------------------------------------------------------
+    # 4. ENTRY POINT PRINCIPALE
+    # ---------------------------------------------------------
+
+    def generate_features(self, ticker: str):
+        _log.info("📊 Calcolo metriche finanziarie per: %s", ticker)
+
+        df = self.load_clean(ticker)
+        df = self.compute_metrics(df)
+        self.save_features(df, ticker)
+
+        _log.info("✔️ Feature engineering completato.")
+        return df
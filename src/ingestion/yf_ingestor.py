@@ -1,70 +1,101 @@
-import yfinance as yf
-import pandas as pd
-from pathlib import Path
+from __future__ import annotations
+
+import logging
 import time
-from yfinance.exceptions import YFRateLimitError
-
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+_log = logging.getLogger(__name__)
+
+__all__ = ["YFIngestor"]
+
+
 class YFIngestor:
-    """
-    Ingestione automatica dei bilanci tramite Yahoo Finance (yfinance).
-    Nessuna API key richiesta.
-    """
-
-    def __init__(self, save_path: str = "data/raw"):
-        self.save_path = Path(save_path)
-        self.save_path.mkdir(parents=True, exist_ok=True)
-
-    def get_income_statement(self, ticker: str):
-        t = yf.Ticker(ticker)
-        df = t.income_stmt.transpose()
-        df.reset_index(names="date", inplace=True)
-        df.to_csv(self.save_path / f"{ticker}_income.csv", index=False)
-        return df
-
-    def get_balance_sheet(self, ticker: str):
-        t = yf.Ticker(ticker)
-        df = t.balance_sheet.transpose()
-        df.reset_index(names="date", inplace=True)
-        df.to_csv(self.save_path / f"{ticker}_balance.csv", index=False)
-        return df
-
-    def get_cash_flow(self, ticker: str):
-        t = yf.Ticker(ticker)
+    """
+    Ingestione automatica dei bilanci tramite Yahoo Finance (yfinance).
+    Nessuna API key richiesta.
+    """
+
+    def __init__(self, save_path: str = "data/raw"):
+        self.save_path = Path(save_path)
+        self.save_path.mkdir(parents=True, exist_ok=True)
+        # un solo oggetto Ticker (e quindi una sola sessione) per simbolo
+        self._ticker_cache = {}
+
+    def _ticker(self, ticker: str) -> "yf.Ticker":
+        # import pigro: yfinance (e le sue dipendenze pesanti) viene
+        # caricato solo quando si fa davvero ingestion
+        import yfinance as yf
+
+        return self._ticker_cache.setdefault(ticker, yf.Ticker(ticker))
+
+    def get_income_statement(self, ticker: str, t: "yf.Ticker" = None):
+        t = self._ticker(ticker) if t is None else t
+        df = t.income_stmt.transpose()
+        df.reset_index(names="date", inplace=True)
+        df.to_parquet(self.save_path / f"{ticker}_income.parquet", compression="snappy", index=False)
+        return df
+
+    def get_balance_sheet(self, ticker: str, t: "yf.Ticker" = None):
+        t = self._ticker(ticker) if t is None else t
+        df = t.balance_sheet.transpose()
+        df.reset_index(names="date", inplace=True)
+        df.to_parquet(self.save_path / f"{ticker}_balance.parquet", compression="snappy", index=False)
+        return df
+
+    def get_cash_flow(self, ticker: str, t: "yf.Ticker" = None):
+        t = self._ticker(ticker) if t is None else t
         df = t.cashflow.transpose()
         df.reset_index(names="date", inplace=True)
-        df.to_csv(self.save_path / f"{ticker}_cashflow.csv", index=False)
+        df.to_parquet(self.save_path / f"{ticker}_cashflow.parquet", compression="snappy", index=False)
         return df
 
-    def get_price_history(self, ticker: str, period: str = "5y", interval: str = "1d"):
-        t = yf.Ticker(ticker)
+    def get_price_history(self, ticker: str, period: str = "5y", interval: str = "1d", t: "yf.Ticker" = None):
+        t = self._ticker(ticker) if t is None else t
         df = t.history(period=period, interval=interval, auto_adjust=False)
         if df.empty:
             return df
         df.reset_index(inplace=True)
-        df.to_csv(self.save_path / f"{ticker}_price.csv", index=False)
+        df.to_parquet(self.save_path / f"{ticker}_price.parquet", compression="snappy", index=False)
         return df
 
     def ingest_all(self, ticker: str):
-        print(f"\n📥 Scarico bilanci per: {ticker} da Yahoo Finance")
+        _log.info("📥 Scarico bilanci per: %s da Yahoo Finance", ticker)
 
-        is_df = self.get_income_statement(ticker)
-        print("   ✓ Income Statement OK")
-
-        bs_df = self.get_balance_sheet(ticker)
-        print("   ✓ Balance Sheet OK")
-
-        cf_df = self.get_cash_flow(ticker)
-        print("   ✓ Cash Flow OK")
+        # le quattro richieste sono I/O-bound e indipendenti:
+        # partono in parallelo, condividendo lo stesso yf.Ticker
+        # (sessione HTTP riusata invece di quattro handshake separati)
+        t = self._ticker(ticker)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            futures = {
+                "income": pool.submit(self.get_income_statement, ticker, t),
+                "balance": pool.submit(self.get_balance_sheet, ticker, t),
+                "cashflow": pool.submit(self.get_cash_flow, ticker, t),
+                "price": pool.submit(self.get_price_history, ticker, t=t),
+            }
 
-        price_df = self.get_price_history(ticker)
-        if price_df is not None and not price_df.empty:
-            print("   ✓ Price History OK")
+            is_df = futures["income"].result()
+            _log.info("   ✓ Income Statement OK")
 
-        print("\n✔️ Ingestion completata.\n")
+            bs_df = futures["balance"].result()
+            _log.info("   ✓ Balance Sheet OK")
+
+            cf_df = futures["cashflow"].result()
+            _log.info("   ✓ Cash Flow OK")
+
+            price_df = futures["price"].result()
+            if price_df is not None and not price_df.empty:
+                _log.info("   ✓ Price History OK")
+
+        _log.info("✔️ Ingestion completata.")
 
         return is_df, bs_df, cf_df
 
-    def _try_get_info(self, t: yf.Ticker, attempts: int = 3, base_sleep: float = 1.5) -> dict:
+    def _try_get_info(self, t: "yf.Ticker", attempts: int = 3, base_sleep: float = 1.5) -> dict:
+        from yfinance.exceptions import YFRateLimitError
+
         last_err = None
         for i in range(attempts):
             try:
@@ -77,17 +108,17 @@ class YFIngestor:
                 last_err = err
                 time.sleep(base_sleep)
         if last_err is not None:
-            print("⚠️  Yahoo Finance rate limit or network error while fetching metadata. Continuing with partial data.")
+            _log.warning("⚠️  Yahoo Finance rate limit or network error while fetching metadata. Continuing with partial data.")
         return {}
 
-    def _try_get_fast_info(self, t: yf.Ticker) -> dict:
+    def _try_get_fast_info(self, t: "yf.Ticker") -> dict:
         try:
             fast_info = t.fast_info
             return fast_info if isinstance(fast_info, dict) else {}
         except Exception:
             return {}
 
-    def _try_get_last_price(self, t: yf.Ticker) -> float | None:
+    def _try_get_last_price(self, t: "yf.Ticker") -> float | None:
         try:
             hist = t.history(period="5d", interval="1d", auto_adjust=False)
             if hist is None or hist.empty:
@@ -98,9 +129,9 @@ class YFIngestor:
             return float(last_close)
         except Exception:
             return None
-    
+    
     def get_report_metadata(self, ticker: str) -> dict:
-        t = yf.Ticker(ticker)
+        t = self._ticker(ticker)
         info = self._try_get_info(t)
         fast_info = self._try_get_fast_info(t)
 
@@ -133,5 +164,5 @@ class YFIngestor:
             "revenue_ttm": info.get("totalRevenue"),
             "current_price": current_price,
         }
-
-
+
+
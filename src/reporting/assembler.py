@@ -1,3 +1,6 @@
+import numpy as np
+
+
 class ReportAssembler:
     """
     Traduce l'output strutturato dell'AnalystEngine
@@ -61,7 +64,9 @@ class ReportAssembler:
 
     @staticmethod
     def _is_finite(value):
-        try:
-            return value is not None and float(value) == float(value)
-        except Exception:
-            return False
+        # check su tipi numerici senza try/except né doppia conversione float
+        return (
+            value is not None
+            and isinstance(value, (int, float, np.floating))
+            and not (value != value)
+        )
@@ -1,56 +1,170 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-
-class ChartGenerator:
-    """
-    Genera grafici professionali in stile minimal da includere nel PDF.
-    """
-
-    def __init__(self, output_path="reports/charts"):
-        self.output_path = Path(output_path)
-        self.output_path.mkdir(parents=True, exist_ok=True)
-
-        # Stile minimal professionale (senza usare seaborn)
-        plt.rcParams["axes.edgecolor"] = "black"
-        plt.rcParams["axes.linewidth"] = 0.6
-        plt.rcParams["axes.labelcolor"] = "black"
-        plt.rcParams["text.color"] = "black"
-        plt.rcParams["xtick.color"] = "black"
-        plt.rcParams["ytick.color"] = "black"
-        plt.rcParams["grid.color"] = "#DDDDDD"
-        plt.rcParams["grid.linestyle"] = "-"
-        plt.rcParams["grid.linewidth"] = 0.5
-
-    # ------------------- TOOL INTERNO ------------------- #
-
-    def _save_fig(self, fig, filename):
+import hashlib
+import threading
+
+import matplotlib
+
+# backend raster headless: evita l'init del backend GUI di default,
+# i grafici vengono solo salvati su file
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        # decoratore identità: il fallback NumPy resta utilizzabile
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+
+        def wrapper(func):
+            return func
+        return wrapper
+
+
+@njit(cache=True)
+def _radar_arrays(values):
+    """
+    Geometria del radar: angoli equispaziati e poligono chiuso
+    (primo punto ripetuto in coda) in un'unica passata compilata.
+    """
+    n = values.shape[0]
+    angles = np.empty(n + 1, np.float64)
+    closed = np.empty(n + 1, np.float64)
+    step = 2.0 * np.pi / n
+    for i in range(n):
+        angles[i] = step * i
+        closed[i] = values[i]
+    angles[n] = 0.0
+    closed[n] = values[0]
+    return angles, closed
+
+
+# etichette di legenda per i chart multi-serie
+_MARGIN_LABELS = {
+    "gross_margin": "Gross",
+    "operating_margin": "Operating",
+    "net_margin": "Net",
+}
+_GROWTH_LABELS = {
+    "total_revenue": "Revenue",
+    "net_income": "Net Income",
+}
+
+
+class ChartGenerator:
+    """
+    Genera grafici professionali in stile minimal da includere nel PDF.
+    """
+
+    def __init__(self, output_path="reports/charts"):
+        self.output_path = Path(output_path)
+        self.output_path.mkdir(parents=True, exist_ok=True)
+
+        # Stile minimal professionale (senza usare seaborn)
+        plt.rcParams["axes.edgecolor"] = "black"
+        plt.rcParams["axes.linewidth"] = 0.6
+        plt.rcParams["axes.labelcolor"] = "black"
+        plt.rcParams["text.color"] = "black"
+        plt.rcParams["xtick.color"] = "black"
+        plt.rcParams["ytick.color"] = "black"
+        plt.rcParams["grid.color"] = "#DDDDDD"
+        plt.rcParams["grid.linestyle"] = "-"
+        plt.rcParams["grid.linewidth"] = 0.5
+
+        # figura a linee persistente PER THREAD: Agg rilascia il GIL in
+        # rasterizzazione, quindi i chart possono essere disegnati in
+        # parallelo purché ognuno abbia la propria Figure (lo stato
+        # matplotlib di una figura non è thread-safe). ax.cla() tra un
+        # chart e l'altro al posto di costruzione/teardown della Figure
+        self._tls = threading.local()
+
+        # il radar resta una figura condivisa, disegnata dal solo thread
+        # principale: il lock serializza disegno+salvataggio per sicurezza
+        self._lock = threading.Lock()
+        self._radar_fig = Figure(figsize=(5, 5), constrained_layout=True)
+        self._radar_ax = self._radar_fig.add_subplot(111, polar=True)
+        self._radar_fig.set_constrained_layout_pads(w_pad=0.02, h_pad=0.02)
+
+        # angoli del radar memoizzati per numero di assi
+        self._angle_cache = {}
+
+    # ------------------- TOOL INTERNO ------------------- #
+
+    def _line_axes(self):
+        """
+        Figure/Axes a linee del thread corrente (creati al primo uso).
+        Figure "pura" (niente pyplot): nessun registro globale da toccare.
+        """
+        ax = getattr(self._tls, "line_ax", None)
+        if ax is None:
+            fig = Figure(figsize=(6, 3), constrained_layout=True)
+            fig.set_constrained_layout_pads(w_pad=0.02, h_pad=0.02)
+            ax = fig.add_subplot(111)
+            self._tls.line_fig = fig
+            self._tls.line_ax = ax
+        return self._tls.line_fig, ax
+
+    def _save_fig(self, fig, filename, dpi=110):
         path = self.output_path / filename
-        fig.savefig(path, dpi=200, bbox_inches="tight")
-        plt.close(fig)
+        # niente bbox_inches="tight" (doppio render): il layout è già
+        # calcolato da constrained_layout. DPI dimensionati sul formato
+        # di embed nel PDF (6x3 pollici), non sui 200 di default.
+        # Compressione zlib minima: PNG più rapidi da scrivere, tanto
+        # finiscono inglobati nel PDF
+        fig.savefig(path, dpi=dpi, pil_kwargs={"compress_level": 1})
         return str(path)
 
-    def _placeholder_fig(self, title):
-        fig, ax = plt.subplots(figsize=(6, 3))
+    def _chart_path(self, ticker, kind, df, cols):
+        """
+        Path content-addressed: il nome file incorpora l'hash dei dati
+        rilevanti, così un re-run con input invariati riusa il PNG.
+        """
+        present = [c for c in cols if c in df.columns]
+        if present:
+            digest = hashlib.blake2b(
+                pd.util.hash_pandas_object(df[present]).values.tobytes()
+            ).hexdigest()[:16]
+        else:
+            digest = "nodata"
+        return self.output_path / f"{ticker}_{kind}_{digest}.png"
+
+    @staticmethod
+    def _draw_placeholder(ax, title):
         ax.set_title(title, fontsize=12)
         ax.axis("off")
         ax.text(0.5, 0.5, "Dati non disponibili", ha="center", va="center")
-        return fig
 
-    def _has_series(self, df: pd.DataFrame, column: str):
-        return column in df.columns and df[column].dropna().shape[0] > 0
+    def _has_series(self, df: pd.DataFrame, column: str, _has: dict = None):
+        # il chiamante può passare una mappa di disponibilità precalcolata
+        # (evita di rifare notna().any() per ogni uso della stessa colonna)
+        if _has is not None:
+            return _has.get(column, False)
+        # notna().any() corto-circuita senza materializzare la serie filtrata
+        return column in df.columns and df[column].notna().any()
 
     # ------------------- 1. FCF Chart ------------------- #
 
-    def plot_fcf(self, df: pd.DataFrame, ticker: str):
+    def plot_fcf(self, df: pd.DataFrame, ticker: str, _has: dict = None):
         title = f"{ticker} – Free Cash Flow"
-        if not self._has_series(df, "free_cash_flow"):
-            fig = self._placeholder_fig(title)
-            return self._save_fig(fig, f"{ticker}_fcf.png")
+        path = self._chart_path(ticker, "fcf", df, ("date", "free_cash_flow"))
+        if path.exists():
+            return str(path)
+
+        fig, ax = self._line_axes()
+        ax.cla()
+
+        if not self._has_series(df, "free_cash_flow", _has):
+            self._draw_placeholder(ax, title)
+            return self._save_fig(fig, path.name)
 
-        fig, ax = plt.subplots(figsize=(6, 3))
         ax.plot(df["date"], df["free_cash_flow"], linewidth=2)
         ax.set_title(title, fontsize=12)
         ax.set_xlabel("Anno")
@@ -58,47 +172,54 @@ class ChartGenerator:
         ax.tick_params(axis="x", rotation=45)
         ax.grid(True)
 
-        return self._save_fig(fig, f"{ticker}_fcf.png")
-
-    # ------------------- 2. Margins ------------------- #
-
-    def plot_margins(self, df: pd.DataFrame, ticker: str):
+        return self._save_fig(fig, path.name)
+
+    # ------------------- 2. Margins ------------------- #
+
+    def plot_margins(self, df: pd.DataFrame, ticker: str, _has: dict = None):
         title = f"{ticker} – Margini"
-        has_any = any(
-            self._has_series(df, col)
-            for col in ["gross_margin", "operating_margin", "net_margin"]
+        cols = [c for c in _MARGIN_LABELS if self._has_series(df, c, _has)]
+        path = self._chart_path(
+            ticker, "margins", df,
+            ("date", "gross_margin", "operating_margin", "net_margin"),
         )
-        if not has_any:
-            fig = self._placeholder_fig(title)
-            return self._save_fig(fig, f"{ticker}_margins.png")
+        if path.exists():
+            return str(path)
 
-        fig, ax = plt.subplots(figsize=(6, 3))
+        fig, ax = self._line_axes()
+        ax.cla()
 
-        if self._has_series(df, "gross_margin"):
-            ax.plot(df["date"], df["gross_margin"], label="Gross", linewidth=2)
-        if self._has_series(df, "operating_margin"):
-            ax.plot(df["date"], df["operating_margin"], label="Operating", linewidth=2)
-        if self._has_series(df, "net_margin"):
-            ax.plot(df["date"], df["net_margin"], label="Net", linewidth=2)
+        if not cols:
+            self._draw_placeholder(ax, title)
+            return self._save_fig(fig, path.name)
 
+        # tutte le serie in un'unica chiamata plot (matrice N x k):
+        # una sola passata di autoscaling invece di una per linea
+        lines = ax.plot(df["date"].to_numpy(), df[cols].to_numpy(), linewidth=2)
         ax.set_title(title, fontsize=12)
         ax.set_xlabel("Anno")
         ax.set_ylabel("Margine")
-        ax.legend(frameon=False)
+        ax.legend(lines, [_MARGIN_LABELS[c] for c in cols], frameon=False)
         ax.tick_params(axis="x", rotation=45)
         ax.grid(True)
 
-        return self._save_fig(fig, f"{ticker}_margins.png")
-
-    # ------------------- 3. Leverage ------------------- #
-
-    def plot_leverage(self, df: pd.DataFrame, ticker: str):
+        return self._save_fig(fig, path.name)
+
+    # ------------------- 3. Leverage ------------------- #
+
+    def plot_leverage(self, df: pd.DataFrame, ticker: str, _has: dict = None):
         title = f"{ticker} – Debt/Equity"
-        if not self._has_series(df, "debt_to_equity"):
-            fig = self._placeholder_fig(title)
-            return self._save_fig(fig, f"{ticker}_leverage.png")
+        path = self._chart_path(ticker, "leverage", df, ("date", "debt_to_equity"))
+        if path.exists():
+            return str(path)
+
+        fig, ax = self._line_axes()
+        ax.cla()
+
+        if not self._has_series(df, "debt_to_equity", _has):
+            self._draw_placeholder(ax, title)
+            return self._save_fig(fig, path.name)
 
-        fig, ax = plt.subplots(figsize=(6, 3))
         ax.plot(df["date"], df["debt_to_equity"], linewidth=2)
         ax.set_title(title, fontsize=12)
         ax.set_xlabel("Anno")
@@ -106,55 +227,63 @@ class ChartGenerator:
         ax.tick_params(axis="x", rotation=45)
         ax.grid(True)
 
-        return self._save_fig(fig, f"{ticker}_leverage.png")
-
-    # ------------------- 4. Growth ------------------- #
-
-    def plot_growth(self, df: pd.DataFrame, ticker: str):
+        return self._save_fig(fig, path.name)
+
+    # ------------------- 4. Growth ------------------- #
+
+    def plot_growth(self, df: pd.DataFrame, ticker: str, _has: dict = None):
         title = f"{ticker} – Crescita Ricavi & Utile"
-        has_any = any(
-            self._has_series(df, col) for col in ["total_revenue", "net_income"]
-        )
-        if not has_any:
-            fig = self._placeholder_fig(title)
-            return self._save_fig(fig, f"{ticker}_growth.png")
+        cols = [c for c in _GROWTH_LABELS if self._has_series(df, c, _has)]
+        path = self._chart_path(ticker, "growth", df, ("date", "total_revenue", "net_income"))
+        if path.exists():
+            return str(path)
 
-        fig, ax = plt.subplots(figsize=(6, 3))
+        fig, ax = self._line_axes()
+        ax.cla()
 
-        if self._has_series(df, "total_revenue"):
-            ax.plot(df["date"], df["total_revenue"], linewidth=2, label="Revenue")
-        if self._has_series(df, "net_income"):
-            ax.plot(df["date"], df["net_income"], linewidth=2, label="Net Income")
+        if not cols:
+            self._draw_placeholder(ax, title)
+            return self._save_fig(fig, path.name)
 
+        lines = ax.plot(df["date"].to_numpy(), df[cols].to_numpy(), linewidth=2)
         ax.set_title(title, fontsize=12)
         ax.set_xlabel("Anno")
         ax.set_ylabel("Valore")
-        ax.legend(frameon=False)
+        ax.legend(lines, [_GROWTH_LABELS[c] for c in cols], frameon=False)
         ax.tick_params(axis="x", rotation=45)
         ax.grid(True)
 
-        return self._save_fig(fig, f"{ticker}_growth.png")
-
-    # ------------------- 5. Radar Chart Scores ------------------- #
-
-    def plot_scores(self, scores: dict, ticker: str):
-        labels = list(scores.keys())
-        values = list(scores.values())
-
-        angles = np.linspace(0, 2 * np.pi, len(labels), endpoint=False).tolist()
-        values += values[:1]
-        angles += angles[:1]
-
-        fig = plt.figure(figsize=(5, 5))
-        ax = plt.subplot(111, polar=True)
-
-        ax.plot(angles, values, linewidth=2)
-        ax.fill(angles, values, alpha=0.15)
-
-        ax.set_yticklabels([])
-        ax.set_xticks(angles[:-1])
-        ax.set_xticklabels(labels)
-
-        ax.set_title(f"{ticker} – Scores Radar", fontsize=12)
-
-        return self._save_fig(fig, f"{ticker}_scores.png")
+        return self._save_fig(fig, path.name)
+
+    # ------------------- 5. Radar Chart Scores ------------------- #
+
+    def plot_scores(self, scores: dict, ticker: str):
+        labels = list(scores.keys())
+
+        digest = hashlib.blake2b(repr(sorted(scores.items())).encode()).hexdigest()[:16]
+        path = self.output_path / f"{ticker}_scores_{digest}.png"
+        if path.exists():
+            return str(path)
+
+        raw = np.array(
+            [np.nan if v is None else v for v in scores.values()],
+            dtype=np.float64,
+        )
+        angles, values = _radar_arrays(raw)
+        # gli angoli dipendono solo dal numero di assi: riusati fra ticker
+        angles = self._angle_cache.setdefault(len(labels), angles)
+
+        with self._lock:
+            ax = self._radar_ax
+            ax.cla()
+
+            ax.plot(angles, values, linewidth=2)
+            ax.fill(angles, values, alpha=0.15)
+
+            ax.set_yticklabels([])
+            ax.set_xticks(angles[:-1])
+            ax.set_xticklabels(labels)
+
+            ax.set_title(f"{ticker} – Scores Radar", fontsize=12)
+
+            return self._save_fig(self._radar_fig, path.name, dpi=150)